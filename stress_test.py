@@ -3,6 +3,7 @@ import os
 import random
 import threading
 import logging
+import datetime
 from util_service import (
     start_service, stop_service, get_service_status, handle_non_stop
 )
@@ -10,21 +11,24 @@ from util_log import LogSetup
 from util_time import smart_sleep
 from util_subprocess import (
     run_powershell, nsdiag_update_config, enable_wake_timers,
-    nsdiag_enable_client
+    nsdiag_enable_client, nsdiag_collect_log
 )
 from util_resources import (
-    log_resource_usage, enable_privilege
+    log_resource_usage, enable_privilege, ResourceSampler, set_resource_backend, get_probe
 )
 from util_input import start_input_monitor
-from util_crash import check_crash_dumps, crash_handle
+from util_crash import check_crash_dumps, crash_handle, generate_live_dump
 from util_config import AgentConfigManager
 from util_tool_config import ToolConfig
 from util_power import enter_s0_and_wake, enter_s4_and_wake, is_s4_available
+from util_url_store import UrlStore, BatchComposer, url_record
+from util_url_health import LivenessCache, UrlHealth, liveness_checker_loop
+from util_log_stats import LogStats
+from util_leak import LeakDetector
 import util_traffic
 import util_client
 import util_validate
 import util_webui
-from urllib.parse import urlparse
 import re
 
 TINY_SEC = 5
@@ -67,8 +71,15 @@ class StressTest:
         self.config = ToolConfig(r"data\config.json")
         self.stop_event = threading.Event()
 
-        self.urls = []
-        self.url_cursor = 0
+        self.urls = UrlStore()
+        self.liveness = None
+        self.liveness_thread = None
+        self.sampler = None
+        self.sampler_thread = None
+        self.leak_detector = None
+        self.health = None
+        self.composer = None
+        self.log_stats = None
         self.manage_nic_script = os.path.join(self.tool_dir, "manage_nic.ps1")
         self.total_zero_dumps = 0
         self.client_thread = None
@@ -112,6 +123,15 @@ class StressTest:
         util_webui.perform_onprem_setup(self.config.config_data, tenant_host, password)
 
         self.load_urls()
+        if self.config.url_health_enabled:
+            self.health = UrlHealth(self.config.url_health_quarantine_sec)
+        self.composer = BatchComposer(
+            self.urls,
+            self.config.url_batch_policy,
+            self.config.url_batch_max_hosts,
+            self.config.url_batch_max_per_host,
+            self.config.url_batch_zipf_s
+        )
 
         st_cfg = util_validate.get_steering_config()
         if not st_cfg:
@@ -121,12 +141,22 @@ class StressTest:
         if not mode:
             mode = st_cfg.get("traffic_mode")
 
+        if self.config.nslog_metrics_enabled:
+            self.log_stats = LogStats(
+                os.path.join(current_log_dir, "nslog_metrics.jsonl"),
+                self.config.nslog_metrics_flush_sec
+            )
+
         if mode == "all" or mode == "web":
             self.validation_enabled = True
             logger.info(f"Validation Enabled. Mode: {mode}")
             util_validate.get_validator().update_pos_with_time_buffer(10)
+            util_validate.start_log_follower(self.stop_event, self.log_stats)
         else:
             logger.info(f"Validation Disabled. Mode: '{mode}' (Requires 'all' or 'web')")
+            if self.log_stats:
+                util_validate.get_validator().update_pos_to_end()
+                util_validate.start_log_follower(self.stop_event, self.log_stats)
 
         if self.config.aoac_s0_standby_enabled or self.config.aoac_s4_hibernate_enabled:
             enable_wake_timers()
@@ -140,18 +170,27 @@ class StressTest:
         nsdiag_enable_client(True, self.cfg_mgr.is_64bit)
 
     def tear_down(self):
+        self.stop_event.set()
+        if self.sampler_thread:
+            self.sampler_thread.join(timeout=5)
+        if self.sampler:
+            self.sampler.close()
         self.cfg_mgr.restore_config()
+        if self.liveness:
+            self.liveness.save()
+        if self.log_stats:
+            self.log_stats.close()
 
     def load_urls(self):
         try:
             if not os.path.exists(self.url_file):
                 logger.error(f"{self.url_file} not found.")
                 return
-            with open(self.url_file, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-            self.urls = [line.strip().rstrip('/') for line in lines if line.strip()]
-            random.shuffle(self.urls)
-            logger.info(f"Loaded {len(self.urls)} URLs from {self.url_file}")
+            self.urls.load(self.url_file)
+            logger.info(
+                f"Loaded {len(self.urls)} URLs from {self.url_file} "
+                f"({self.urls.memory_bytes() / 1024:.0f}KB)"
+            )
         except Exception as e:
             logger.error(f"Error loading URLs: {e}")
 
@@ -172,6 +211,88 @@ class StressTest:
             )
             self.client_thread.start()
 
+    def start_liveness_thread(self):
+        if not self.config.url_liveness_enabled or not len(self.urls):
+            return
+
+        self.liveness = LivenessCache(
+            self.config.url_liveness_file,
+            self.config.url_liveness_ttl,
+            self.config.url_liveness_dead_ttl
+        )
+        self.liveness.load()
+        self.liveness_thread = threading.Thread(
+            target=liveness_checker_loop,
+            args=(
+                self.liveness,
+                self.urls,
+                self.config.url_liveness_concurrent,
+                self.stop_event,
+                lambda: self.cfg_mgr.failclose_active
+            ),
+            daemon=True
+        )
+        self.liveness_thread.start()
+
+    def start_sampler_thread(self):
+        set_resource_backend(self.config.resource_sampler_backend)
+        if not self.config.resource_sampler_enabled:
+            return
+
+        self.sampler = ResourceSampler(
+            "stAgentSvc.exe", current_log_dir, self.config.resource_sampler_hz,
+            on_sample=self.on_resource_sample if self.leak_detector else None
+        )
+        self.sampler_thread = threading.Thread(
+            target=self.sampler.run,
+            args=(self.stop_event,),
+            daemon=True
+        )
+        self.sampler_thread.start()
+
+    def init_leak_detector(self):
+        if not self.config.leak_detection_enabled:
+            return
+        self.leak_detector = LeakDetector(
+            self.config.leak_window_min * 60,
+            self.config.leak_private_mb_per_hour,
+            self.config.leak_handles_per_hour,
+            self.config.leak_iter_window,
+            self.config.leak_private_mb_per_iter,
+            self.config.leak_handles_per_iter
+        )
+        if not self.config.resource_sampler_enabled:
+            logger.warning(
+                "Resource sampler disabled, leak detection uses the per-iteration trend only."
+            )
+
+    def on_resource_sample(self, ts, sample, instance):
+        self.leak_detector.add_sample(ts, sample[1], sample[2], instance)
+
+    def exec_leak_check(self, count):
+        if not self.leak_detector:
+            return False
+
+        probe = self.sampler.probe if self.sampler else get_probe("stAgentSvc.exe")
+        sample = self.sampler.latest if self.sampler else probe.sample()
+        if sample:
+            self.leak_detector.end_iteration(count, sample[1], sample[2], probe.creation)
+
+        findings = self.leak_detector.check()
+        if not findings:
+            return False
+        for finding in findings:
+            logger.error(f"Possible stAgentSvc.exe leak: {finding}")
+
+        if probe.pid:
+            output_dir = os.path.join(current_log_dir, f"leak_iter{count}")
+            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            generate_live_dump(probe.pid, output_dir)
+            nsdiag_collect_log(timestamp, self.cfg_mgr.is_64bit, output_dir)
+        else:
+            logger.error("stAgentSvc.exe not running, live dump skipped.")
+        return self.config.leak_stop_on_detect
+
     def exec_failclose_check(self):
         if not self.cfg_mgr.failclose_active:
              logger.info("FailClose simulation not active. Skipping check.")
@@ -183,7 +304,8 @@ class StressTest:
         if smart_sleep(20, self.stop_event):
             return
 
-        test_urls = random.sample(self.urls, min(len(self.urls), 10))
+        skip = self.liveness.is_dead if self.liveness else None
+        test_urls = self.urls.sample(10, skip)
         logger.info(f"Checking {len(test_urls)} URLs for reachability...")
         for url in test_urls:
             if self.stop_event.is_set(): break
@@ -297,7 +419,7 @@ class StressTest:
     def exec_curl_requests(self):
         util_traffic.curl_requests(self.urls, self.stop_event)
 
-    def exec_validation_checks(self, process_map):
+    def exec_validation_checks(self, process_map, since_seq=None):
         if not self.validation_enabled:
             logger.info("Validation skipped (disabled by cloud_app_mode).")
             return True
@@ -313,46 +435,44 @@ class StressTest:
              return True
 
         return util_validate.validate_traffic_flow(
-            process_map, self.stop_event, self.cfg_mgr.url_in_nsexception
+            process_map, self.stop_event, self.cfg_mgr.url_in_nsexception, since_seq
         )
 
-    def get_next_batch(self, batch_size):
-        if not self.urls:
-            return []
-
-        if len(self.urls) <= batch_size:
-            batch = self.urls[:]
-
-            random.shuffle(self.urls)
-            return batch
-
-        end_idx = self.url_cursor + batch_size
-        if end_idx <= len(self.urls):
-            batch = self.urls[self.url_cursor : end_idx]
-            self.url_cursor = end_idx
-            if self.url_cursor == len(self.urls):
-                 self.url_cursor = 0
-                 random.shuffle(self.urls)
-                 logger.info("All URLs used. Re-shuffling list.")
-            return batch
-        else:
+    def exec_flow_validation(self, proto_flows, since_seq=None):
+        if not self.config.flow_validation_enabled or not proto_flows:
+            return True
+        if not self.validation_enabled:
+            return True
+        if self.config.client_disabling_enabled and not self.client_enabled_event.is_set():
+            logger.info("Flow validation skipped (Client is disabled).")
+            return True
 
-            batch = self.urls[self.url_cursor :]
+        return util_validate.validate_sampled_flows(
+            proto_flows, self.stop_event, since_seq,
+            self.config.flow_validation_budget_sec,
+            self.config.flow_validation_max_samples
+        )
 
-            random.shuffle(self.urls)
-            logger.info("All URLs used. Re-shuffling list.")
+    def should_skip_url(self, url):
+        if self.liveness and self.liveness.is_dead(url):
+            return True
+        if self.health and self.health.should_skip(url):
+            return True
+        return False
 
-            self.url_cursor = 0
-            needed = batch_size - len(batch)
-            if needed > 0:
-                batch.extend(self.urls[0:needed])
-                self.url_cursor = needed
-            return batch
+    def get_next_batch(self, batch_size):
+        skip = None
+        if self.liveness or self.health:
+            skip = self.should_skip_url
+        return self.composer.compose(batch_size, skip)
 
     def run(self):
         start_input_monitor(self.stop_event)
         self.header_msg()
         self.start_client_thread()
+        self.start_liveness_thread()
+        self.init_leak_detector()
+        self.start_sampler_thread()
 
         count = 0
         for count in range(1, self.config.loop_times + 1):
@@ -383,23 +503,19 @@ class StressTest:
 
                 current_iter_urls = self.get_next_batch(batch_size)
 
+                follower = util_validate.get_log_follower()
+                flow_mark = follower.mark() if follower else None
+
 
                 curl_flood_urls = []
+                proto_flows = {}
 
                 if self.cfg_mgr.failclose_active:
                     logger.info("FailClose simulation active. Skipping traffic flooding.")
                 else:
                     if self.config.dns_enabled:
-                        dns_domains = []
-                        for u in current_iter_urls:
-                            try:
-                                parsed = urlparse(u)
-                                if parsed.netloc:
-                                    dns_domains.append(parsed.netloc)
-                                else:
-                                    dns_domains.append(u.split('/')[0])
-                            except Exception:
-                                pass
+                        dns_domains = [url_record(u).host for u in current_iter_urls]
+                        dns_domains = [d for d in dns_domains if d]
 
                         util_traffic.generate_dns_flood(
                             dns_domains,
@@ -408,6 +524,7 @@ class StressTest:
                             self.config.dns_concurrent,
                             self.stop_event
                         )
+                        proto_flows["DNS"] = [(None, None, 53)]
 
                     if self.config.udp_enabled:
                         current_target = self.config.udp_target_ip
@@ -418,7 +535,7 @@ class StressTest:
                                 use_ipv6 = True
                             else:
                                 current_target = self.config.udp_target_ip
-                        util_traffic.generate_udp_flood(
+                        proto_flows["UDP"] = util_traffic.generate_udp_flood(
                             current_target,
                             self.config.udp_target_port,
                             self.config.udp_count,
@@ -446,6 +563,15 @@ class StressTest:
                         else:
                             logger.warning(f"AB Test skipped. URL not alive: {current_ab_url}")
 
+                    if self.config.http_download_enabled:
+                        util_traffic.generate_http_download_flood(
+                            self.config.http_download_target_urls,
+                            self.config.http_download_count,
+                            self.config.http_download_duration,
+                            self.config.http_download_concurrent,
+                            self.stop_event
+                        )
+
                     if self.config.curl_flood_enabled:
 
                         browser_count = 0
@@ -467,11 +593,12 @@ class StressTest:
                             self.config.curl_flood_count,
                             self.config.curl_flood_duration,
                             self.config.curl_flood_concurrent,
-                            self.stop_event
+                            self.stop_event,
+                            self.health
                         )
 
                     if self.config.ftp_enabled:
-                        util_traffic.generate_ftp_traffic(
+                        proto_flows["FTP"] = util_traffic.generate_ftp_traffic(
                             self.config.ftp_target_ip,
                             self.config.ftp_target_port,
                             self.config.ftp_user,
@@ -484,7 +611,7 @@ class StressTest:
                         )
 
                     if self.config.ftps_enabled:
-                        util_traffic.generate_ftps_traffic(
+                        proto_flows["FTPS"] = util_traffic.generate_ftps_traffic(
                             self.config.ftps_target_ip,
                             self.config.ftps_target_port,
                             self.config.ftps_user,
@@ -497,7 +624,11 @@ class StressTest:
                         )
 
                     if self.config.sftp_enabled:
-                        util_traffic.generate_sftp_traffic(
+                        ssh_profile = None
+                        if self.config.sftp_ssh_profiles:
+                            profiles = self.config.sftp_ssh_profiles
+                            ssh_profile = profiles[(count - 1) % len(profiles)]
+                        proto_flows["SFTP"] = util_traffic.generate_sftp_traffic(
                             self.config.sftp_target_ip,
                             self.config.sftp_target_port,
                             self.config.sftp_user,
@@ -506,7 +637,8 @@ class StressTest:
                             self.config.sftp_count,
                             self.config.sftp_duration,
                             self.config.sftp_concurrent,
-                            self.stop_event
+                            self.stop_event,
+                            ssh_profile
                         )
 
                 if self.stop_event.is_set(): break
@@ -530,7 +662,7 @@ class StressTest:
                     check_browser = browser_urls and self.config.browser_log_validation
                     check_curl = curl_flood_urls and self.config.curl_flood_log_validation
 
-                    if check_browser or check_curl:
+                    if (check_browser or check_curl) and flow_mark is None:
                         logger.info("Waiting for logs to be flushed...")
                         if smart_sleep(10, self.stop_event): break
 
@@ -551,10 +683,14 @@ class StressTest:
                         )
                         validation_map["curl.exe"] = random.sample(curl_flood_urls, sample_size)
 
-                    if not self.exec_validation_checks(validation_map):
+                    if not self.exec_validation_checks(validation_map, flow_mark):
                         logger.error("Validation failed! Stopping stress test.")
                         break
 
+                    if not self.exec_flow_validation(proto_flows, flow_mark):
+                        logger.error("Flow validation failed! Stopping stress test.")
+                        break
+
                 if self.stop_event.is_set(): break
 
                 if self.config.stop_svc_interval > 0:
@@ -640,6 +776,10 @@ class StressTest:
                         self.config.custom_dump_path
                     )
                     break
+
+                if self.exec_leak_check(count):
+                    logger.error("Leak detected. Stopping test.")
+                    break
             except Exception:
                 logger.exception("An error occurred:")
                 logger.info(f"Retrying in {STD_SEC} seconds")
@@ -2,6 +2,7 @@ import os
 import sys
 import logging
 import argparse
+import multiprocessing
 import subprocess
 import threading
 import time
@@ -15,26 +16,145 @@ try:
     from pyftpdlib.handlers import TLS_FTPHandler
 except ImportError:
     TLS_FTPHandler = None
-from pyftpdlib.servers import ThreadedFTPServer
+from pyftpdlib.servers import FTPServer, ThreadedFTPServer
+try:
+    from pyftpdlib.servers import MultiprocessFTPServer
+except ImportError:
+    MultiprocessFTPServer = None
 from pyftpdlib.filesystems import AbstractedFS
 
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
+logging.getLogger("pyftpdlib").setLevel(logging.WARNING)
 logger = logging.getLogger()
 
+class TransferStats:
+    def __init__(self):
+        self.active = multiprocessing.Value('q', 0)
+        self.sessions = multiprocessing.Value('q', 0)
+        self.files = multiprocessing.Value('q', 0)
+        self.bytes_received = multiprocessing.Value('q', 0)
+        self.session_bytes = multiprocessing.Value('q', 0)
+        self.session_secs = multiprocessing.Value('d', 0.0)
+        self.last_bytes = 0
+        self.last_time = time.time()
+
+    def session_started(self) -> None:
+        with self.active.get_lock():
+            self.active.value += 1
+
+    def session_ended(self, received: int, elapsed: float) -> None:
+        with self.active.get_lock():
+            self.active.value -= 1
+        with self.sessions.get_lock():
+            self.sessions.value += 1
+        with self.session_bytes.get_lock():
+            self.session_bytes.value += received
+        with self.session_secs.get_lock():
+            self.session_secs.value += elapsed
+
+    def add_bytes(self, count: int) -> None:
+        with self.bytes_received.get_lock():
+            self.bytes_received.value += count
+
+    def file_done(self) -> None:
+        with self.files.get_lock():
+            self.files.value += 1
+
+    def report(self) -> None:
+        now = time.time()
+        total = self.bytes_received.value
+        elapsed = max(now - self.last_time, 0.001)
+        mbps = (total - self.last_bytes) / elapsed / (1024 * 1024)
+        self.last_bytes = total
+        self.last_time = now
+
+        avg_session = 0.0
+        if self.session_secs.value > 0:
+            avg_session = self.session_bytes.value / self.session_secs.value / (1024 * 1024)
+
+        logger.info(
+            f"Sessions: {self.active.value} active, {self.sessions.value} closed | "
+            f"Files: {self.files.value} | Recv: {total / (1024 * 1024):.1f}MB, "
+            f"{mbps:.2f} MB/s | Avg session: {avg_session:.2f} MB/s"
+        )
+
+STATS = TransferStats()
+
+class DiscardFile:
+    def __init__(self, name, cmd_channel):
+        self.name = name
+        self.closed = False
+        self.cmd_channel = cmd_channel
+
+    def write(self, data) -> int:
+        size = len(data)
+        if self.cmd_channel is not None:
+            self.cmd_channel.session_bytes += size
+        STATS.add_bytes(size)
+        return size
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            STATS.file_done()
+
 class BlackholeFS(AbstractedFS):
     def open(self, filename, mode):
         if 'w' in mode or 'a' in mode:
-            logger.info(f"Receiving file: {filename}")
-            return open(os.devnull, 'wb')
+            return DiscardFile(filename, self.cmd_channel)
         return super().open(filename, mode)
 
     def remove(self, filename):
-        logger.info(f"Deleting file: {filename}")
         return None
 
+class SessionStatsMixin:
+    forked_sessions = False
+    session_bytes = 0
+    session_start = None
+    session_pid = 0
+
+    def on_connect(self):
+        self.session_bytes = 0
+        self.session_start = time.time()
+        self.session_pid = os.getpid()
+        STATS.session_started()
+
+    def on_disconnect(self):
+        if self.session_start is None:
+            return
+        if self.forked_sessions and os.getpid() == self.session_pid:
+            return
+        STATS.session_ended(self.session_bytes, time.time() - self.session_start)
+        self.session_start = None
+
+class StatsFTPHandler(SessionStatsMixin, FTPHandler):
+    pass
+
+if TLS_FTPHandler is not None:
+    class StatsTLSFTPHandler(SessionStatsMixin, TLS_FTPHandler):
+        pass
+else:
+    StatsTLSFTPHandler = None
+
+SERVER_CLASSES = {
+    "thread": ThreadedFTPServer,
+    "async": FTPServer,
+    "multiprocess": MultiprocessFTPServer,
+}
+
+def parse_port_range(value: str) -> range | None:
+    if not value:
+        return None
+    start, _, end = value.partition('-')
+    start = int(start)
+    end = int(end) if end else start
+    if not (1 <= start <= end <= 65535):
+        raise ValueError(value)
+    return range(start, end + 1)
+
 def generate_cert(cert_path, key_path):
     if os.path.exists(cert_path) and os.path.exists(key_path):
         return
@@ -87,8 +207,24 @@ def main():
     parser.add_argument("--password", type=str, default="password")
     parser.add_argument("--directory", type=str, default=".")
     parser.add_argument("--ftps", action="store_true")
+    parser.add_argument("--server", choices=list(SERVER_CLASSES), default="thread")
+    parser.add_argument("--passive-ports", type=str, default="",
+                        help="Passive port range, e.g. 60000-60999")
+    parser.add_argument("--max-cons", type=int, default=512)
+    parser.add_argument("--stats-interval", type=int, default=10)
     args = parser.parse_args()
 
+    try:
+        passive_ports = parse_port_range(args.passive_ports)
+    except ValueError:
+        logger.error(f"Invalid --passive-ports: {args.passive_ports}")
+        sys.exit(1)
+
+    server_class = SERVER_CLASSES[args.server]
+    if server_class is None:
+        logger.warning(f"'{args.server}' server not supported on this OS. Using 'thread'.")
+        server_class = ThreadedFTPServer
+
     if not os.path.exists(args.directory):
         os.makedirs(args.directory)
 
@@ -98,42 +234,52 @@ def main():
     )
 
     if args.ftps:
-        if TLS_FTPHandler is None:
+        if StatsTLSFTPHandler is None:
             logger.error("FTPS not supported (TLS_FTPHandler not found). Install pyopenssl?")
             sys.exit(1)
         cert_file = "cert.pem"
         key_file = "key.pem"
         generate_cert(cert_file, key_file)
-        handler = TLS_FTPHandler
+        handler = StatsTLSFTPHandler
         handler.certfile = cert_file
         handler.keyfile = key_file
         handler.tls_control_required = True
         handler.tls_data_required = True
     else:
-        handler = FTPHandler
+        handler = StatsFTPHandler
 
     handler.authorizer = authorizer
     handler.abstracted_fs = BlackholeFS
+    if passive_ports:
+        handler.passive_ports = passive_ports
+    handler.forked_sessions = server_class is MultiprocessFTPServer
 
-    server = ThreadedFTPServer(('0.0.0.0', args.port), handler)
-    logger.info(f"Starting {'FTPS' if args.ftps else 'FTP'} on {args.port}")
-    logger.info("Press ESC to stop the server")
+    server = server_class(('0.0.0.0', args.port), handler)
+    server.max_cons = args.max_cons
+    logger.info(
+        f"Starting {'FTPS' if args.ftps else 'FTP'} on {args.port} "
+        f"({server_class.__name__}, max_cons {args.max_cons})"
+    )
+    if passive_ports:
+        logger.info(f"Passive ports: {passive_ports.start}-{passive_ports.stop - 1}")
+    logger.info("Press ESC or Ctrl+C to stop the server")
 
     stop_event = threading.Event()
     start_input_monitor(stop_event)
 
-    server_thread = threading.Thread(target=server.serve_forever)
-    server_thread.daemon = True
-    server_thread.start()
-
+    next_report = time.time() + args.stats_interval
     try:
         while not stop_event.is_set():
-            time.sleep(0.5)
+            server.serve_forever(timeout=0.5, blocking=False, handle_exit=False)
+            if args.stats_interval > 0 and time.time() >= next_report:
+                STATS.report()
+                next_report = time.time() + args.stats_interval
     except KeyboardInterrupt:
         pass
     finally:
         logger.info("Stopping FTP server...")
         server.close_all()
+        STATS.report()
 
 if __name__ == "__main__":
     main()
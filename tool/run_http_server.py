@@ -1,11 +1,18 @@
 import argparse
+import asyncio
 import logging
+import mimetypes
+import multiprocessing
 import os
+import re
+import socket
 import sys
 import threading
 import time
 from functools import partial
+from http import HTTPStatus
 from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs, unquote
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from util_input import start_input_monitor
@@ -16,7 +23,87 @@ logging.basicConfig(
 )
 logger = logging.getLogger()
 
+PAYLOAD_SIZE = 1024 * 1024
+PAYLOAD = memoryview(b'0' * PAYLOAD_SIZE)
+MAX_BODY_BYTES = 10 * 1024 * 1024 * 1024
+MAX_DELAY_MS = 60000
+DEFAULT_CHUNK = 64 * 1024
+MAX_STATIC_BYTES = 64 * 1024 * 1024
+LISTEN_BACKLOG = 4096
+SERVER_NAME = "StressTestHTTP/1.0"
+
+SYNTHETIC_RE = re.compile(r'^/(bytes|stream|delay|status)/(\d+)/?$')
+
+def parse_synthetic(path: str) -> tuple[str, int, int] | None:
+    parts = urlsplit(path)
+    match = SYNTHETIC_RE.match(parts.path)
+    if not match:
+        return None
+
+    kind, value = match.group(1), int(match.group(2))
+    chunk = DEFAULT_CHUNK
+    if kind == "stream":
+        query = parse_qs(parts.query)
+        if "chunk" in query:
+            chunk = int(query["chunk"][0])
+        chunk = max(1, min(chunk, PAYLOAD_SIZE))
+    if kind in ("bytes", "stream"):
+        value = min(value, MAX_BODY_BYTES)
+    elif kind == "delay":
+        value = min(value, MAX_DELAY_MS)
+    elif not 200 <= value <= 599:
+        raise ValueError(value)
+    return kind, value, chunk
+
+class RequestStats:
+    def __init__(self, access_log="sample", sample_rate=1000):
+        self.access_log = access_log
+        self.sample_rate = max(1, sample_rate)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.bytes_sent = 0
+        self.last_requests = 0
+        self.last_bytes = 0
+        self.last_time = time.time()
+
+    def record(self, status: int, sent: int = 0) -> bool:
+        with self.lock:
+            self.requests += 1
+            self.bytes_sent += sent
+            if status >= 400:
+                self.errors += 1
+            count = self.requests
+
+        if self.access_log == "all":
+            return True
+        if self.access_log == "sample":
+            return count % self.sample_rate == 1 or self.sample_rate == 1
+        return False
+
+    def add_bytes(self, sent: int) -> None:
+        with self.lock:
+            self.bytes_sent += sent
+
+    def report(self) -> None:
+        now = time.time()
+        with self.lock:
+            elapsed = max(now - self.last_time, 0.001)
+            rps = (self.requests - self.last_requests) / elapsed
+            mbps = (self.bytes_sent - self.last_bytes) / elapsed / (1024 * 1024)
+            self.last_requests = self.requests
+            self.last_bytes = self.bytes_sent
+            self.last_time = now
+            total, errors = self.requests, self.errors
+
+        logger.info(
+            f"[pid {os.getpid()}] Requests: {total} (errors {errors}), "
+            f"{rps:.0f} req/s, {mbps:.2f} MB/s"
+        )
+
 class QuietHandler(SimpleHTTPRequestHandler):
+    stats = None
+
     def log_message(self, format, *args):
 
         logger.info("%s - - [%s] %s" %
@@ -24,30 +111,303 @@ class QuietHandler(SimpleHTTPRequestHandler):
                      self.log_date_time_string(),
                      format % args))
 
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--port", type=int, default=80)
-    parser.add_argument("--directory", type=str, default=".")
-    args = parser.parse_args()
+    def log_request(self, code='-', size='-'):
+        status = code.value if isinstance(code, HTTPStatus) else code
+        if not isinstance(status, int):
+            status = 0
+        if self.stats is None or self.stats.record(status):
+            super().log_request(code, size)
 
-    if not os.path.exists(args.directory):
-        os.makedirs(args.directory)
+class SyntheticHandler(QuietHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        if not self._handle_synthetic(send_body=True):
+            super().do_GET()
+
+    def do_HEAD(self):
+        if not self._handle_synthetic(send_body=False):
+            super().do_HEAD()
+
+    def _handle_synthetic(self, send_body) -> bool:
+        try:
+            route = parse_synthetic(self.path)
+        except ValueError:
+            self.send_error(HTTPStatus.BAD_REQUEST, "Invalid parameter")
+            return True
+        if route is None:
+            return False
 
-    handler_class = partial(QuietHandler, directory=os.path.abspath(args.directory))
+        kind, value, chunk = route
+        try:
+            if kind == "bytes":
+                self._send_bytes(value, send_body)
+            elif kind == "stream":
+                self._send_stream(value, chunk, send_body)
+            elif kind == "delay":
+                time.sleep(value / 1000.0)
+                self._send_bytes(0, send_body)
+            else:
+                self._send_status(value)
+        except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError):
+            self.close_connection = True
+        return True
+
+    def _send_bytes(self, size, send_body):
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(size))
+        self.end_headers()
+        if not send_body:
+            return
+        remaining = size
+        while remaining > 0:
+            n = min(remaining, PAYLOAD_SIZE)
+            self.wfile.write(PAYLOAD[:n])
+            remaining -= n
+        if self.stats:
+            self.stats.add_bytes(size)
+
+    def _send_stream(self, size, chunk, send_body):
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        if not send_body:
+            return
+        remaining = size
+        while remaining > 0:
+            n = min(remaining, chunk)
+            self.wfile.write(f"{n:X}\r\n".encode('ascii'))
+            self.wfile.write(PAYLOAD[:n])
+            self.wfile.write(b"\r\n")
+            remaining -= n
+        self.wfile.write(b"0\r\n\r\n")
+        if self.stats:
+            self.stats.add_bytes(size)
+
+    def _send_status(self, code):
+        self.send_response(code)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+class StressHTTPServer(ThreadingHTTPServer):
+    request_queue_size = LISTEN_BACKLOG
+
+def _build_head(status: int, headers: list, keep_alive: bool) -> bytes:
+    try:
+        phrase = HTTPStatus(status).phrase
+    except ValueError:
+        phrase = ""
+    lines = [f"HTTP/1.1 {status} {phrase}", f"Server: {SERVER_NAME}"]
+    lines.extend(f"{k}: {v}" for k, v in headers)
+    lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1')
+
+def _resolve_static(directory: str, target: str) -> str | None:
+    rel = unquote(urlsplit(target).path).lstrip('/')
+    full = os.path.realpath(os.path.join(directory, rel))
+    if full != directory and not full.startswith(directory + os.sep):
+        return None
+    if os.path.isdir(full):
+        full = os.path.join(full, "index.html")
+    if not os.path.isfile(full):
+        return None
+    return full
+
+def _read_file(path: str) -> bytes | None:
+    try:
+        if os.path.getsize(path) > MAX_STATIC_BYTES:
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+async def _write_payload(writer, size: int, chunk: int, chunked: bool) -> None:
+    remaining = size
+    while remaining > 0:
+        n = min(remaining, chunk)
+        if chunked:
+            writer.write(f"{n:X}\r\n".encode('ascii'))
+            writer.write(PAYLOAD[:n])
+            writer.write(b"\r\n")
+        else:
+            writer.write(PAYLOAD[:n])
+        remaining -= n
+        await writer.drain()
+    if chunked:
+        writer.write(b"0\r\n\r\n")
+
+async def _respond_async(writer, method, target, directory, keep_alive) -> tuple[int, int]:
+    send_body = method == "GET"
+    if method not in ("GET", "HEAD"):
+        writer.write(_build_head(405, [("Content-Length", "0")], keep_alive))
+        return 405, 0
+
+    try:
+        route = parse_synthetic(target)
+    except ValueError:
+        writer.write(_build_head(400, [("Content-Length", "0")], keep_alive))
+        return 400, 0
+
+    if route is None:
+        path = _resolve_static(directory, target)
+        body = await asyncio.to_thread(_read_file, path) if path else None
+        if body is None:
+            writer.write(_build_head(404, [("Content-Length", "0")], keep_alive))
+            return 404, 0
+        ctype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        headers = [("Content-Type", ctype), ("Content-Length", str(len(body)))]
+        writer.write(_build_head(200, headers, keep_alive))
+        if send_body:
+            writer.write(body)
+            return 200, len(body)
+        return 200, 0
+
+    kind, value, chunk = route
+    if kind == "status":
+        writer.write(_build_head(value, [("Content-Length", "0")], keep_alive))
+        return value, 0
+
+    if kind == "delay":
+        await asyncio.sleep(value / 1000.0)
+        value = 0
+
+    headers = [("Content-Type", "application/octet-stream")]
+    chunked = kind == "stream"
+    if chunked:
+        headers.append(("Transfer-Encoding", "chunked"))
+    else:
+        headers.append(("Content-Length", str(value)))
+        chunk = PAYLOAD_SIZE
+    writer.write(_build_head(200, headers, keep_alive))
+    if not send_body:
+        return 200, 0
+    await _write_payload(writer, value, chunk, chunked)
+    return 200, value
+
+async def _handle_async_client(reader, writer, directory, stats) -> None:
+    peer = writer.get_extra_info('peername')
+    peer_ip = peer[0] if peer else "-"
+    try:
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                break
+
+            lines = head.decode('latin-1').split("\r\n")
+            request_line = lines[0].split()
+            if len(request_line) != 3:
+                writer.write(_build_head(400, [("Content-Length", "0")], False))
+                stats.record(400)
+                break
+
+            method, target, version = request_line
+            headers = {}
+            for line in lines[1:]:
+                if ":" in line:
+                    key, val = line.split(":", 1)
+                    headers[key.strip().lower()] = val.strip()
+
+            conn_hdr = headers.get("connection", "").lower()
+            if version == "HTTP/1.1":
+                keep_alive = conn_hdr != "close"
+            else:
+                keep_alive = conn_hdr == "keep-alive"
+
+            body_len = int(headers.get("content-length", "0") or 0)
+            if body_len > 0:
+                await reader.readexactly(body_len)
+
+            status, sent = await _respond_async(
+                writer, method, target, directory, keep_alive
+            )
+            await writer.drain()
+
+            if stats.record(status, sent):
+                logger.info(f'{peer_ip} - - "{method} {target} {version}" {status} {sent}')
+
+            if not keep_alive:
+                break
+    except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        try:
+            writer.close()
+        except Exception:
+            pass
+
+def _make_reuseport_socket(port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind(('0.0.0.0', port))
+    sock.listen(LISTEN_BACKLOG)
+    sock.setblocking(False)
+    return sock
+
+async def _serve_async(port, directory, stats, stop_event, stats_interval, sock=None):
+    handler = partial(_handle_async_client, directory=directory, stats=stats)
+    if sock is not None:
+        server = await asyncio.start_server(handler, sock=sock, backlog=LISTEN_BACKLOG)
+    else:
+        server = await asyncio.start_server(
+            handler, '0.0.0.0', port, backlog=LISTEN_BACKLOG, reuse_address=True
+        )
+
+    next_report = time.time() + stats_interval
+    async with server:
+        while not stop_event.is_set():
+            await asyncio.sleep(0.5)
+            if stats_interval > 0 and time.time() >= next_report:
+                stats.report()
+                next_report = time.time() + stats_interval
+    stats.report()
 
+def _async_worker_main(port, directory, access_log, sample_rate, stats_interval, stop_event):
+    stats = RequestStats(access_log, sample_rate)
     try:
-        server = ThreadingHTTPServer(('0.0.0.0', args.port), handler_class)
+        sock = _make_reuseport_socket(port)
+    except OSError as e:
+        logger.error(f"[pid {os.getpid()}] Failed to bind port {port}: {e}")
+        return
+    try:
+        asyncio.run(_serve_async(port, directory, stats, stop_event, stats_interval, sock))
+    except KeyboardInterrupt:
+        pass
+
+def _wait_for_stop(stop_event, stats=None, stats_interval=0) -> None:
+    next_report = time.time() + stats_interval
+    try:
+        while not stop_event.is_set():
+            time.sleep(0.5)
+            if stats and stats_interval > 0 and time.time() >= next_report:
+                stats.report()
+                next_report = time.time() + stats_interval
+    except KeyboardInterrupt:
+        pass
+
+def _log_bind_denied(port: int) -> None:
+    logger.error(
+        f"Permission denied binding to port {port}. Try running as Admin or use a port > 1024."
+    )
+
+def run_threaded(args, directory, stats) -> None:
+    SyntheticHandler.stats = stats
+    handler_class = partial(SyntheticHandler, directory=directory)
+
+    try:
+        server = StressHTTPServer(('0.0.0.0', args.port), handler_class)
     except PermissionError:
-        logger.error(f"Permission denied binding to port {args.port}. Try running as Admin or use a port > 1024.")
+        _log_bind_denied(args.port)
         return
     except OSError as e:
         logger.error(f"Failed to start server: {e}")
         return
 
-    logger.info(f"HTTP Server running on port {args.port}")
-    logger.info(f"Serving directory: {os.path.abspath(args.directory)}")
-    logger.info("Press ESC to stop the server")
-
     stop_event = threading.Event()
     start_input_monitor(stop_event)
 
@@ -56,14 +416,103 @@ def main():
     server_thread.start()
 
     try:
-        while not stop_event.is_set():
-            time.sleep(0.5)
-    except KeyboardInterrupt:
-        pass
+        _wait_for_stop(stop_event, stats, args.stats_interval)
     finally:
         logger.info("Stopping HTTP server...")
         server.shutdown()
         server.server_close()
+        stats.report()
+
+def run_async(args, directory, stats) -> None:
+    stop_event = threading.Event()
+    start_input_monitor(stop_event)
+
+    try:
+        asyncio.run(
+            _serve_async(args.port, directory, stats, stop_event, args.stats_interval)
+        )
+    except PermissionError:
+        _log_bind_denied(args.port)
+    except OSError as e:
+        logger.error(f"Failed to start server: {e}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        logger.info("Stopping HTTP server...")
+
+def run_async_workers(args, directory) -> None:
+    stop_event = multiprocessing.Event()
+    workers = []
+    for _ in range(args.workers):
+        proc = multiprocessing.Process(
+            target=_async_worker_main,
+            args=(
+                args.port, directory, args.access_log, args.log_sample,
+                args.stats_interval, stop_event
+            ),
+            daemon=True
+        )
+        proc.start()
+        workers.append(proc)
+
+    logger.info(f"Started {len(workers)} async workers with SO_REUSEPORT")
+
+    local_stop = threading.Event()
+    start_input_monitor(local_stop)
+    try:
+        while not local_stop.is_set():
+            time.sleep(0.5)
+            if not any(p.is_alive() for p in workers):
+                logger.error("All workers exited.")
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        logger.info("Stopping HTTP workers...")
+        stop_event.set()
+        for proc in workers:
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.terminate()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=80)
+    parser.add_argument("--directory", type=str, default=".")
+    parser.add_argument("--engine", choices=["thread", "async"], default="thread")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Async worker processes sharing the port (SO_REUSEPORT)")
+    parser.add_argument("--access-log", choices=["all", "sample", "off"], default="sample")
+    parser.add_argument("--log-sample", type=int, default=1000,
+                        help="Log one of every N requests when --access-log=sample")
+    parser.add_argument("--stats-interval", type=int, default=10,
+                        help="Seconds between request counter lines (0 to disable)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.directory):
+        os.makedirs(args.directory)
+    directory = os.path.realpath(args.directory)
+
+    logger.info(f"HTTP Server running on port {args.port} (engine: {args.engine})")
+    logger.info(f"Serving directory: {directory}")
+    logger.info("Synthetic endpoints: /bytes/<n>, /stream/<n>?chunk=, /delay/<ms>, /status/<code>")
+    logger.info(f"Access log: {args.access_log}")
+    logger.info("Press ESC or Ctrl+C to stop the server")
+
+    if args.workers > 1:
+        if args.engine != "async":
+            logger.warning("--workers requires --engine async. Using a single process.")
+        elif not hasattr(socket, "SO_REUSEPORT"):
+            logger.warning("SO_REUSEPORT not supported on this OS. Using a single process.")
+        else:
+            run_async_workers(args, directory)
+            return
+
+    stats = RequestStats(args.access_log, args.log_sample)
+    if args.engine == "async":
+        run_async(args, directory, stats)
+    else:
+        run_threaded(args, directory, stats)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,291 @@
+import argparse
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import util_validate
+
+logger = logging.getLogger()
+
+PROCESSES = ["msedge.exe", "curl.exe", "chrome.exe", "python.exe", "Teams.exe"]
+MODULES = ["nsTunnel.cpp", "nsFlow.cpp", "nsDns.cpp", "nsConfig.cpp", "nsProxy.cpp"]
+INFO_MESSAGES = [
+    "Flow closed, bytes sent: {n}, bytes received: {m}",
+    "Connection to gateway established in {n}ms",
+    "DNS response for host: h{n}.example.com, ttl: {m}",
+    "Steering decision cached for {n} entries",
+    "Keepalive sent to tunnel {n}",
+]
+ERROR_MESSAGES = [
+    "connect to 10.0.{n}.1:443 failed, error: {m}",
+    "SSL handshake failed for flow {n}, error 0x{m:x}",
+]
+WARN_MESSAGES = [
+    "slow response from gateway, {n}ms",
+    "flow table usage at {n}%",
+]
+
+class NsLogWriter:
+    def __init__(self, directory, rotate_mb=50, keep=10):
+        self.directory = directory
+        self.path = os.path.join(directory, "nsdebuglog.log")
+        self.rotate_bytes = int(rotate_mb * 1024 * 1024)
+        self.keep = keep
+        self.lock = threading.Lock()
+        self.file = open(self.path, 'a', encoding='utf-8')
+        self.size = self.file.tell()
+        self.written = 0
+        self.rotations = 0
+
+    def _rotated(self, i):
+        return self.path.replace('.log', f'.{i}.log')
+
+    def rotate(self):
+        self.file.close()
+        last = self._rotated(self.keep)
+        if os.path.exists(last):
+            os.remove(last)
+        for i in range(self.keep - 1, 0, -1):
+            src = self._rotated(i)
+            if os.path.exists(src):
+                os.replace(src, self._rotated(i + 1))
+        os.replace(self.path, self._rotated(1))
+        self.file = open(self.path, 'a', encoding='utf-8')
+        self.size = 0
+        self.rotations += 1
+
+    def write(self, text):
+        with self.lock:
+            self.file.write(text)
+            self.size += len(text)
+            self.written += len(text)
+            if self.size >= self.rotate_bytes:
+                self.rotate()
+
+    def flush(self):
+        with self.lock:
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+def format_ts(ts):
+    millis = int(ts * 1000) % 1000
+    return datetime.fromtimestamp(ts).strftime("%Y/%m/%d %H:%M:%S") + f".{millis:03d}"
+
+def tunnel_line(ts, process, host, port=443):
+    src = random.randint(49152, 65535)
+    return (
+        f"{format_ts(ts)} stAgentSvc p1a2c t{random.randint(1, 0xffff):04x} info nsTunnel.cpp:1274 "
+        f"Tunneling flow from addr: 192.168.1.20:{src}, process: {process} "
+        f"to host: {host}:{port}, addr: 10.{random.randint(0, 255)}.0.1:{port} to nsProxy\n"
+    )
+
+def bypass_line(ts, process, host):
+    return (
+        f"{format_ts(ts)} stAgentSvc p1a2c t{random.randint(1, 0xffff):04x} info nsFlow.cpp:812 "
+        f"bypassing flow to exception host: {host}, process: {process}, reason: cert pinned\n"
+    )
+
+def filler_line(ts):
+    roll = random.random()
+    if roll < 0.01:
+        level, text = "error", random.choice(ERROR_MESSAGES)
+    elif roll < 0.03:
+        level, text = "warn", random.choice(WARN_MESSAGES)
+    else:
+        level, text = "info", random.choice(INFO_MESSAGES)
+    text = text.format(n=random.randint(1, 9999), m=random.randint(1, 99999))
+    return (
+        f"{format_ts(ts)} stAgentSvc p1a2c t{random.randint(1, 0xffff):04x} {level} "
+        f"{random.choice(MODULES)}:{random.randint(10, 3000)} {text}\n"
+    )
+
+def synthetic_line(ts, flow_ratio):
+    roll = random.random()
+    if roll < flow_ratio * 0.9:
+        return tunnel_line(ts, random.choice(PROCESSES), f"site{random.randint(1, 50000)}.com")
+    if roll < flow_ratio:
+        return bypass_line(ts, random.choice(PROCESSES), f"pinned{random.randint(1, 500)}.com")
+    return filler_line(ts)
+
+def generate_history(writer, size_mb, rate, flow_ratio):
+    target = int(size_mb * 1024 * 1024)
+    avg_line = len(filler_line(time.time()))
+    ts = time.time() - target / avg_line / rate
+    step = 1.0 / rate
+    buf = []
+    start = time.time()
+    while writer.written < target:
+        buf.append(synthetic_line(ts, flow_ratio))
+        ts += step
+        if len(buf) >= 5000:
+            writer.write("".join(buf))
+            buf = []
+    if buf:
+        writer.write("".join(buf))
+    writer.flush()
+    elapsed = time.time() - start
+    logger.info(
+        f"Generated {writer.written / 1048576:.0f}MB in {elapsed:.1f}s, "
+        f"{writer.rotations} rotations"
+    )
+
+def live_writer(writer, rate, flow_ratio, stop_event):
+    batch = max(1, rate // 20)
+    while not stop_event.is_set():
+        now = time.time()
+        writer.write("".join(synthetic_line(now, flow_ratio) for _ in range(batch)))
+        writer.flush()
+        stop_event.wait(0.05)
+
+def _mbps(nbytes, elapsed):
+    return nbytes / 1048576 / max(elapsed, 1e-6)
+
+def _percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+def bench_seek(validator, buffer_sec):
+    start = time.time()
+    validator.update_pos_with_time_buffer(buffer_sec)
+    cold = time.time() - start
+    start = time.time()
+    validator.update_pos_with_time_buffer(buffer_sec)
+    warm = time.time() - start
+    logger.info(
+        f"Seek ({buffer_sec}s buffer): cold {cold * 1000:.1f}ms, warm {warm * 1000:.1f}ms, "
+        f"{len(validator.pending_reads)} pending files"
+    )
+
+def bench_read(validator):
+    validator.pending_reads = []
+    total_bytes = os.path.getsize(validator.log_path)
+    for path in reversed(validator.rotated_paths()):
+        validator.pending_reads.append((os.stat(path).st_ino, 0))
+        total_bytes += os.path.getsize(path)
+    validator.last_pos = 0
+    validator.last_inode = os.stat(validator.log_path).st_ino
+    start = time.time()
+    lines = validator.read_new_lines()
+    elapsed = time.time() - start
+    logger.info(
+        f"read_new_lines: {len(lines)} flow lines from {total_bytes / 1048576:.0f}MB "
+        f"in {elapsed:.2f}s ({_mbps(total_bytes, elapsed):.0f} MB/s)"
+    )
+
+def bench_check_log(validator):
+    size = os.path.getsize(validator.log_path)
+    for label, pattern, is_regex in (
+        ("literal miss", "no-such-marker-in-log", False),
+        ("regex miss", r"process: nosuch\.exe to host: \S+:443", True),
+    ):
+        validator.last_pos = 0
+        start = time.time()
+        found = validator.check_log(pattern, is_regex=is_regex)
+        elapsed = time.time() - start
+        logger.info(
+            f"check_log {label}: found={found}, {size / 1048576:.0f}MB in {elapsed:.3f}s "
+            f"({_mbps(size, elapsed):.0f} MB/s)"
+        )
+
+def bench_validation(writer, rounds, urls_per_round, use_follower, stop_event):
+    follower = util_validate.start_log_follower(stop_event) if use_follower else None
+    latencies = []
+    for r in range(rounds):
+        hosts = [f"bench{r}-{i}.com" for i in range(urls_per_round)]
+        process_map = {"curl.exe": [f"https://{h}/" for h in hosts]}
+        mark = follower.mark() if follower else None
+        start = time.time()
+        now = time.time()
+        writer.write("".join(tunnel_line(now, "curl.exe", h) for h in hosts))
+        writer.flush()
+        ok = util_validate.validate_traffic_flow(process_map, stop_event, None, mark, timeout=10)
+        latencies.append(time.time() - start)
+        if not ok:
+            logger.warning(f"Validation round {r + 1} failed")
+    mode = "follower" if use_follower else "poll"
+    logger.info(
+        f"validate_traffic_flow ({mode}, {urls_per_round} URLs x {rounds}): "
+        f"p50 {_percentile(latencies, 50) * 1000:.0f}ms, "
+        f"p95 {_percentile(latencies, 95) * 1000:.0f}ms, max {max(latencies) * 1000:.0f}ms"
+    )
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=["generate", "bench"], default="bench")
+    parser.add_argument("--dir", type=str, default=os.path.join("log", "nslog_bench"))
+    parser.add_argument("--size-mb", type=float, default=200,
+                        help="History written before the benchmark (or in generate mode)")
+    parser.add_argument("--rotate-mb", type=float, default=50)
+    parser.add_argument("--rate", type=int, default=20000,
+                        help="Lines per second (timestamps of history, live writer speed)")
+    parser.add_argument("--flow-ratio", type=float, default=0.05,
+                        help="Share of lines that are tunnel/bypass flows")
+    parser.add_argument("--duration", type=int, default=0,
+                        help="generate mode: keep appending live for N seconds after history")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--urls", type=int, default=50, help="URLs per validation round")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    logging.getLogger("util_validate").setLevel(logging.WARNING)
+    logging.getLogger("util_log_index").setLevel(logging.WARNING)
+    random.seed(args.seed)
+
+    if os.path.exists(args.dir):
+        for name in os.listdir(args.dir):
+            if name.startswith("nsdebuglog") or name.startswith("time_index"):
+                os.remove(os.path.join(args.dir, name))
+    else:
+        os.makedirs(args.dir)
+
+    writer = NsLogWriter(args.dir, args.rotate_mb)
+    generate_history(writer, args.size_mb, args.rate, args.flow_ratio)
+    stop_event = threading.Event()
+
+    if args.mode == "generate":
+        if args.duration > 0:
+            logger.info(f"Appending at {args.rate} lines/s for {args.duration}s...")
+            t = threading.Thread(
+                target=live_writer, args=(writer, args.rate, args.flow_ratio, stop_event),
+                daemon=True
+            )
+            t.start()
+            stop_event.wait(args.duration)
+            stop_event.set()
+            t.join()
+        writer.close()
+        logger.info(f"Logs written to {args.dir}")
+        return
+
+    validator = util_validate.init_validator(
+        writer.path, os.path.join(args.dir, "time_index.json")
+    )
+    bench_seek(validator, 10)
+    bench_read(validator)
+    bench_check_log(validator)
+
+    validator.update_pos_to_end()
+    t = threading.Thread(
+        target=live_writer, args=(writer, args.rate, args.flow_ratio, stop_event), daemon=True
+    )
+    t.start()
+    try:
+        bench_validation(writer, args.rounds, args.urls, False, stop_event)
+        bench_validation(writer, args.rounds, args.urls, True, stop_event)
+    finally:
+        stop_event.set()
+        t.join()
+        writer.close()
+
+if __name__ == "__main__":
+    main()
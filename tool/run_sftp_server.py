@@ -1,13 +1,17 @@
 import argparse
+import concurrent.futures
 import logging
 import os
 import socket
+import stat
 import threading
+import time
 import sys
 import paramiko
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from util_input import start_input_monitor
+from util_ssh import apply_ssh_profile, describe_transport
 
 logging.basicConfig(
     level=logging.INFO,
@@ -16,25 +20,136 @@ logging.basicConfig(
 logging.getLogger("paramiko").setLevel(logging.WARNING)
 logger = logging.getLogger()
 
+class SessionStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.sessions = 0
+        self.rejected = 0
+        self.failed = 0
+        self.files = 0
+        self.bytes_received = 0
+        self.handshakes = 0
+        self.handshake_secs = 0.0
+        self.negotiated = set()
+        self.last_bytes = 0
+        self.last_time = time.time()
+
+    def handshake_done(self, elapsed: float, negotiated: str) -> None:
+        with self.lock:
+            self.handshakes += 1
+            self.handshake_secs += elapsed
+            is_new = negotiated not in self.negotiated
+            self.negotiated.add(negotiated)
+        if is_new:
+            logger.info(f"Negotiated SSH profile: {negotiated}")
+
+    def session_started(self) -> None:
+        with self.lock:
+            self.active += 1
+
+    def session_ended(self, ok: bool) -> None:
+        with self.lock:
+            self.active -= 1
+            self.sessions += 1
+            if not ok:
+                self.failed += 1
+
+    def session_rejected(self) -> None:
+        with self.lock:
+            self.rejected += 1
+
+    def add_bytes(self, count: int) -> None:
+        with self.lock:
+            self.bytes_received += count
+
+    def file_done(self) -> None:
+        with self.lock:
+            self.files += 1
+
+    def report(self) -> None:
+        now = time.time()
+        with self.lock:
+            elapsed = max(now - self.last_time, 0.001)
+            mbps = (self.bytes_received - self.last_bytes) / elapsed / (1024 * 1024)
+            self.last_bytes = self.bytes_received
+            self.last_time = now
+            total_mb = self.bytes_received / (1024 * 1024)
+            avg_hs_ms = 0.0
+            if self.handshakes:
+                avg_hs_ms = self.handshake_secs / self.handshakes * 1000
+            msg = (
+                f"Sessions: {self.active} active, {self.sessions} closed "
+                f"({self.failed} failed, {self.rejected} rejected) | "
+                f"Files: {self.files} | Recv: {total_mb:.1f}MB, {mbps:.2f} MB/s | "
+                f"Handshake avg {avg_hs_ms:.0f}ms"
+            )
+        logger.info(msg)
+
+STATS = SessionStats()
+
+class DiscardHandle(paramiko.SFTPHandle):
+    def __init__(self, flags, path, sizes):
+        super().__init__(flags)
+        self.path = path
+        self.sizes = sizes
+        self.size = 0
+
+    def write(self, offset, data):
+        length = len(data)
+        self.size = max(self.size, offset + length)
+        STATS.add_bytes(length)
+        return paramiko.SFTP_OK
+
+    def read(self, offset, length):
+        return b''
+
+    def stat(self):
+        return _file_attr(self.size)
+
+    def chattr(self, attr):
+        return paramiko.SFTP_OK
+
+    def close(self):
+        self.sizes[self.path] = self.size
+        STATS.file_done()
+        super().close()
+
+def _file_attr(size: int) -> paramiko.SFTPAttributes:
+    attr = paramiko.SFTPAttributes()
+    attr.st_size = size
+    attr.st_mode = stat.S_IFREG | 0o644
+    attr.st_mtime = int(time.time())
+    return attr
+
+def _dir_attr() -> paramiko.SFTPAttributes:
+    attr = paramiko.SFTPAttributes()
+    attr.st_size = 0
+    attr.st_mode = stat.S_IFDIR | 0o755
+    attr.st_mtime = int(time.time())
+    return attr
+
 class StubSFTPServer(paramiko.SFTPServerInterface):
     def __init__(self, server, *largs, **kwargs):
         super(StubSFTPServer, self).__init__(server, *largs, **kwargs)
+        self.sizes = {}
 
     def list_folder(self, path):
         return []
 
     def stat(self, path):
-        return paramiko.SFTPAttributes.from_stat(os.stat("."))
+        if path in self.sizes:
+            return _file_attr(self.sizes[path])
+        return _dir_attr()
 
     def lstat(self, path):
-        return paramiko.SFTPAttributes.from_stat(os.stat("."))
+        return self.stat(path)
 
     def open(self, path, flags, attr):
-        logger.info(f"Client opened file: {path}")
-        return paramiko.SFTPHandle(flags)
+        return DiscardHandle(flags, path, self.sizes)
 
     def remove(self, path):
-        logger.info(f"Client removed file: {path}")
+        self.sizes.pop(path, None)
         return paramiko.SFTP_OK
 
     def rename(self, oldpath, newpath):
@@ -61,7 +176,9 @@ class StubServer(paramiko.ServerInterface):
         self.password = password
 
     def check_channel_request(self, kind, chanid):
-        return paramiko.OPEN_SUCCEEDED
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
 
     def check_auth_password(self, username, password):
         if username == self.user and password == self.password:
@@ -74,68 +191,148 @@ class StubServer(paramiko.ServerInterface):
     def check_channel_exec_request(self, channel, command):
         return True
 
-def handle_client(client_sock, args, host_key):
-    transport = paramiko.Transport(client_sock)
-    transport.add_server_key(host_key)
-    server = StubServer(args.user, args.password)
+HOST_KEY_CLASSES = {
+    "rsa": paramiko.RSAKey,
+    "ecdsa": paramiko.ECDSAKey,
+    "ed25519": paramiko.Ed25519Key,
+}
+
+def _generate_host_key(key_type: str, keyfile: str) -> None:
+    if key_type == "rsa":
+        paramiko.RSAKey.generate(2048).write_private_key_file(keyfile)
+    elif key_type == "ecdsa":
+        paramiko.ECDSAKey.generate().write_private_key_file(keyfile)
+    else:
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import ed25519
+        data = ed25519.Ed25519PrivateKey.generate().private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.OpenSSH,
+            serialization.NoEncryption()
+        )
+        with open(keyfile, 'wb') as f:
+            f.write(data)
+    logger.info(f"Generated {key_type} host key: {keyfile}")
+
+def handle_client(client_sock, args, host_key, stop_event, slots):
+    STATS.session_started()
+    ok = False
+    transport = None
     try:
-        transport.start_server(server=server)
-        channel = transport.accept(20)
+        transport = paramiko.Transport(client_sock)
+        transport.add_server_key(host_key)
+        apply_ssh_profile(transport, args.ssh_profile)
+        transport.set_subsystem_handler("sftp", paramiko.SFTPServer, StubSFTPServer)
+
+        hs_start = time.time()
+        transport.start_server(server=StubServer(args.user, args.password))
+
+        channel = transport.accept(args.auth_timeout)
         if channel is None:
             return
-        if channel.get_name() == "session":
-            transport.set_subsystem_handler(
-                "sftp", paramiko.SFTPServer, StubSFTPServer
-            )
-            channel.recv(1024)
+        STATS.handshake_done(time.time() - hs_start, describe_transport(transport))
+
+        deadline = time.time() + args.session_timeout if args.session_timeout > 0 else 0
+        while transport.is_active() and not channel.closed and not stop_event.is_set():
+            if deadline and time.time() >= deadline:
+                logger.warning("Session timeout reached. Closing transport.")
+                break
+            transport.join(1.0)
+        ok = True
     except Exception as e:
-        logger.error(f"Connection error: {e}")
+        logger.debug(f"Connection error: {e}")
     finally:
-        transport.close()
+        if transport:
+            transport.close()
+        else:
+            client_sock.close()
+        STATS.session_ended(ok)
+        slots.release()
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--port", type=int, default=2222)
     parser.add_argument("--user", type=str, default="test")
     parser.add_argument("--password", type=str, default="password")
-    parser.add_argument("--keyfile", type=str, default="host.key")
+    parser.add_argument("--keyfile", type=str, default="",
+                        help="Host key file (default: host.key, or host_<type>.key)")
+    parser.add_argument("--host-key-type", choices=list(HOST_KEY_CLASSES), default="rsa")
+    parser.add_argument("--ciphers", type=str, default="",
+                        help="Comma-separated preferred ciphers, e.g. aes128-gcm@openssh.com")
+    parser.add_argument("--macs", type=str, default="")
+    parser.add_argument("--kex", type=str, default="")
+    parser.add_argument("--max-sessions", type=int, default=100,
+                        help="Worker pool size. Extra connections wait for a free slot.")
+    parser.add_argument("--slot-wait", type=float, default=5,
+                        help="Seconds an extra connection waits for a slot before rejection")
+    parser.add_argument("--backlog", type=int, default=128)
+    parser.add_argument("--auth-timeout", type=int, default=20)
+    parser.add_argument("--session-timeout", type=int, default=600,
+                        help="Max session lifetime in seconds (0 for unlimited)")
+    parser.add_argument("--stats-interval", type=int, default=10)
     args = parser.parse_args()
 
+    if not args.keyfile:
+        if args.host_key_type == "rsa":
+            args.keyfile = "host.key"
+        else:
+            args.keyfile = f"host_{args.host_key_type}.key"
+
     if not os.path.exists(args.keyfile):
-        key = paramiko.RSAKey.generate(2048)
-        key.write_private_key_file(args.keyfile)
+        _generate_host_key(args.host_key_type, args.keyfile)
 
-    host_key = paramiko.RSAKey(filename=args.keyfile)
+    host_key = HOST_KEY_CLASSES[args.host_key_type](filename=args.keyfile)
+    args.ssh_profile = {"ciphers": args.ciphers, "macs": args.macs, "kex": args.kex}
 
     sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
     sock.bind(('0.0.0.0', args.port))
-    sock.listen(10)
+    sock.listen(args.backlog)
     sock.settimeout(1.0)
 
-    logger.info(f"SFTP Server listening on {args.port}")
+    logger.info(f"SFTP Server listening on {args.port} (max sessions {args.max_sessions})")
+    logger.info(
+        f"Host key: {host_key.get_name()}, ciphers: {args.ciphers or 'default'}, "
+        f"macs: {args.macs or 'default'}, kex: {args.kex or 'default'}"
+    )
     logger.info("Press ESC to stop the server")
 
     stop_event = threading.Event()
     start_input_monitor(stop_event)
 
-    while not stop_event.is_set():
-        try:
-            client, addr = sock.accept()
-        except socket.timeout:
-            continue
-        except OSError:
-            break
-
-        logger.info(f"Connection from {addr}")
-        t = threading.Thread(
-            target=handle_client, args=(client, args, host_key)
-        )
-        t.daemon = True
-        t.start()
+    slots = threading.BoundedSemaphore(args.max_sessions)
+    pool = concurrent.futures.ThreadPoolExecutor(
+        max_workers=args.max_sessions, thread_name_prefix="sftp"
+    )
+    next_report = time.time() + args.stats_interval
+
+    try:
+        while not stop_event.is_set():
+            if args.stats_interval > 0 and time.time() >= next_report:
+                STATS.report()
+                next_report = time.time() + args.stats_interval
+
+            try:
+                client, addr = sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
 
-    logger.info("Stopping SFTP server...")
-    sock.close()
+            if not slots.acquire(timeout=args.slot_wait):
+                STATS.session_rejected()
+                client.close()
+                continue
+
+            pool.submit(handle_client, client, args, host_key, stop_event, slots)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        logger.info("Stopping SFTP server...")
+        stop_event.set()
+        sock.close()
+        pool.shutdown(wait=True, cancel_futures=True)
+        STATS.report()
 
 if __name__ == "__main__":
     main()
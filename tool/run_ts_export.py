@@ -0,0 +1,72 @@
+import argparse
+import os
+import sys
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util_resources import RESOURCE_HEADER
+from util_timeseries import read_columns, read_rows
+
+def parse_time(value: str) -> float | None:
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+def format_ts(ts: float) -> str:
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+def export(path, out, start=None, end=None) -> int:
+    columns = [name for name, _ in read_columns(path)]
+    raw = columns == ["ts", "cpu", "private", "handles", "threads"]
+    if raw:
+        out.write(RESOURCE_HEADER)
+    else:
+        out.write(", ".join(["Timestamp"] + columns[1:]) + "\n")
+
+    rows = 0
+    for row in read_rows(path, start, end):
+        if raw:
+            _, cpu, private, handles, threads = row
+            out.write(
+                f"{format_ts(row[0])}, {cpu:.0f}%, {private / (1024 * 1024):.1f}MB, "
+                f"{private / 1024:.0f}KB, {handles}, {threads}\n"
+            )
+        else:
+            values = [f"{v:.2f}" if isinstance(v, float) else str(v) for v in row[1:]]
+            out.write(", ".join([format_ts(row[0])] + values) + "\n")
+        rows += 1
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", help="Series file, e.g. log/<run>/stAgentSvc.exe_samples.1m.ts")
+    parser.add_argument("--start", type=str, default="",
+                        help="Epoch seconds or ISO time, e.g. 2024-05-01T12:00:00")
+    parser.add_argument("--end", type=str, default="")
+    parser.add_argument("--out", type=str, default="", help="CSV file (default stdout)")
+    args = parser.parse_args()
+
+    try:
+        start = parse_time(args.start)
+        end = parse_time(args.end)
+    except ValueError as e:
+        print(f"Invalid time: {e}")
+        sys.exit(1)
+
+    if not os.path.exists(args.path):
+        print(f"{args.path} not found.")
+        sys.exit(1)
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            rows = export(args.path, f, start, end)
+        print(f"Exported {rows} rows to {args.out}")
+    else:
+        export(args.path, sys.stdout, start, end)
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,13 @@
 import os
 import sys
+import asyncio
 import concurrent.futures
-import subprocess
 import threading
 import argparse
+import json
+import random
+import socket
+import struct
 import time
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -11,6 +15,8 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from util_traffic import check_url_alive
 from util_log import LogSetup
 from util_input import start_input_monitor
+from util_keyword import KeywordMatcher
+from util_url_index import UrlIndex, merge_into_corpus
 
 log_helper = LogSetup()
 logger = log_helper.setup_logging()
@@ -33,49 +39,114 @@ BLOCKED_KEYWORDS = [
     "pirate", "proxy", "vpn", "anonymizer", "tor", "darkweb", "onion"
 ]
 
-def is_safe_keyword(domain: str) -> bool:
-    domain_lower = domain.lower()
-    for kw in BLOCKED_KEYWORDS:
-        if kw in domain_lower:
-            return False
-    return True
+SESSION_INDICATORS = [
+    "session", "sid", "phpsessid", "jsessionid", "token",
+    "auth", "login", "user", "id=", "utm_", "gclid", "_ga"
+]
 
-def is_safe_dns(domain: str) -> bool:
-    try:
-        cmd = ["nslookup", "-timeout=2", domain, "1.1.1.3"]
-        result = subprocess.run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            encoding='utf-8',
-            errors='ignore'
+BLOCKED_MATCHER = KeywordMatcher(BLOCKED_KEYWORDS)
+SESSION_MATCHER = KeywordMatcher(SESSION_INDICATORS)
+
+def is_safe_keyword(domain: str) -> bool:
+    return not BLOCKED_MATCHER.contains_any(domain)
+
+class SafeDnsResolver(asyncio.DatagramProtocol):
+    def __init__(self, server: str, timeout: float):
+        self.server = (server, 53)
+        self.timeout = timeout
+        self.transport = None
+        self.waiters = {}
+
+    async def open(self) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.create_datagram_endpoint(
+            lambda: self, family=socket.AF_INET, remote_addr=self.server
         )
 
-        output = result.stdout
-        if "0.0.0.0" in output:
+    def close(self) -> None:
+        if self.transport:
+            self.transport.close()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if len(data) < 12:
+            return
+        waiter = self.waiters.pop(struct.unpack('!H', data[:2])[0], None)
+        if waiter and not waiter.done():
+            waiter.set_result(data)
+
+    def error_received(self, exc):
+        logger.debug(f"DNS socket error: {exc}")
+
+    @staticmethod
+    def _build_query(qid: int, domain: str) -> bytes:
+        qname = b''.join(
+            bytes([len(label)]) + label
+            for label in domain.encode('idna').split(b'.') if label
+        )
+        return struct.pack('!HHHHHH', qid, 0x0100, 1, 0, 0, 0) + qname + b'\0\0\1\0\1'
+
+    @staticmethod
+    def _skip_name(data: bytes, pos: int) -> int:
+        while pos < len(data):
+            length = data[pos]
+            if length & 0xC0 == 0xC0:
+                return pos + 2
+            if length == 0:
+                return pos + 1
+            pos += length + 1
+        return pos
+
+    @classmethod
+    def _answers(cls, data: bytes) -> list[bytes]:
+        qdcount, ancount = struct.unpack('!HH', data[4:8])
+        pos = 12
+        for _ in range(qdcount):
+            pos = cls._skip_name(data, pos) + 4
+        addrs = []
+        for _ in range(ancount):
+            pos = cls._skip_name(data, pos)
+            rtype, _rclass, _ttl, rdlen = struct.unpack('!HHIH', data[pos:pos + 10])
+            pos += 10
+            if rtype == 1 and rdlen == 4:
+                addrs.append(data[pos:pos + 4])
+            pos += rdlen
+        return addrs
+
+    async def is_safe(self, domain: str) -> bool:
+        try:
+            query_body = self._build_query(0, domain)[2:]
+        except UnicodeError:
             return False
 
+        loop = asyncio.get_running_loop()
+        for _ in range(2):
+            qid = random.getrandbits(16)
+            while qid in self.waiters:
+                qid = random.getrandbits(16)
+            waiter = loop.create_future()
+            self.waiters[qid] = waiter
+            try:
+                self.transport.sendto(struct.pack('!H', qid) + query_body)
+                data = await asyncio.wait_for(waiter, self.timeout)
+                return b'\0\0\0\0' not in self._answers(data)
+            except asyncio.TimeoutError:
+                continue
+            except (struct.error, IndexError):
+                return True
+            finally:
+                self.waiters.pop(qid, None)
         return True
 
-    except Exception:
-        return False
-
 def clean_session_url(url: str) -> str:
     if '?' not in url:
         return url
 
-    query_part = url.split('?', 1)[1].lower()
-
-    SESSION_INDICATORS = [
-        "session", "sid", "phpsessid", "jsessionid", "token",
-        "auth", "login", "user", "id=", "utm_", "gclid", "_ga"
-    ]
-
-    for indicator in SESSION_INDICATORS:
-        if indicator in query_part:
-            return url.split('?', 1)[0]
-
+    base, query_part = url.split('?', 1)
+    if SESSION_MATCHER.contains_any(query_part):
+        return base
     return url
 
 def is_unwanted_redirect(url: str) -> bool:
@@ -86,38 +157,48 @@ def is_unwanted_redirect(url: str) -> bool:
         return True
     return False
 
-def process_candidate(raw_line: str) -> str | None:
-    parts = raw_line.strip().split(',')
-    domain = parts[-1].strip()
-
-    if not domain:
-        return None
-
+def candidate_domain(raw_line: str) -> str:
+    domain = raw_line.strip().split(',')[-1].strip()
     if "://" in domain:
         domain = domain.split("://")[1]
-    domain = domain.split("/")[0]
-
-    if not is_safe_keyword(domain):
-        return None
-
-    if not is_safe_dns(domain):
-        logger.warning(f"Blocked by Safe DNS: {domain}")
-        return None
-
-    url = f"https://{domain}"
-    final_url = check_url_alive(url)
+    return domain.split("/")[0]
 
+def check_liveness(domain: str) -> str | None:
+    final_url = check_url_alive(f"https://{domain}")
     if not final_url:
-        url = f"http://{domain}"
-        final_url = check_url_alive(url)
+        final_url = check_url_alive(f"http://{domain}")
 
-    if final_url:
-        if is_unwanted_redirect(final_url):
-            logger.warning(f"Blocked unwanted redirect: {final_url}")
-            return None
-        return clean_session_url(final_url)
-
-    return None
+    if not final_url:
+        return None
+    if is_unwanted_redirect(final_url):
+        logger.warning(f"Blocked unwanted redirect: {final_url}")
+        return None
+    return clean_session_url(final_url)
+
+def prefilter_file(src_path: str, dst_path: str) -> tuple[int, int]:
+    kept = 0
+    dropped = 0
+    started = time.time()
+    with open(src_path, 'r', encoding='utf-8', errors='replace') as src, \
+            open(dst_path, 'a', encoding='utf-8') as dst:
+        for raw_line in src:
+            domain = candidate_domain(raw_line)
+            if not domain:
+                continue
+            if BLOCKED_MATCHER.contains_any(domain):
+                dropped += 1
+                continue
+            dst.write(domain + "\n")
+            kept += 1
+            if (kept + dropped) % 1000000 == 0:
+                logger.info(f"Prefilter: {kept + dropped} lines screened...")
+
+    elapsed = max(time.time() - started, 0.001)
+    logger.info(
+        f"Prefilter: kept {kept}, dropped {dropped} by keyword "
+        f"in {elapsed:.1f}s ({(kept + dropped) / elapsed:.0f} lines/s)"
+    )
+    return kept, dropped
 
 def load_urls(filepath):
     if not os.path.exists(filepath):
@@ -125,21 +206,220 @@ def load_urls(filepath):
     with open(filepath, 'r', encoding='utf-8') as f:
         return set(line.strip().rstrip('/') for line in f if line.strip())
 
+def load_checkpoint(path: str, source_size: int) -> int:
+    if not os.path.exists(path):
+        return 0
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get("source_size") != source_size:
+            logger.warning("Checkpoint does not match url_new.txt. Starting from the top.")
+            return 0
+        return int(data.get("next_index", 0))
+    except Exception as e:
+        logger.error(f"Failed to read checkpoint {path}: {e}")
+        return 0
+
+def save_checkpoint(path: str, source_size: int, next_index: int) -> None:
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"source_size": source_size, "next_index": next_index}, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.error(f"Failed to write checkpoint {path}: {e}")
+
+class UrlCheckPipeline:
+    def __init__(self, candidates, start, args, paths, existing_urls, stop_event):
+        self.candidates = candidates
+        self.start = start
+        self.args = args
+        self.paths = paths
+        self.existing_urls = existing_urls
+        self.seen_urls = load_urls(paths["alive"])
+        self.stop_event = stop_event
+
+        self.done = bytearray(len(candidates))
+        self.low_water = 0
+        self.pending_alive = []
+        self.stats = {"keyword": 0, "dns": 0, "dead": 0, "dup": 0, "alive": 0}
+
+    def mark_done(self, idx: int) -> None:
+        self.done[idx] = 1
+        while self.low_water < len(self.done) and self.done[self.low_water]:
+            self.low_water += 1
+
+    def next_index(self) -> int:
+        return self.start + self.low_water
+
+    def flush(self) -> None:
+        if self.pending_alive:
+            with open(self.paths["alive"], 'a', encoding='utf-8') as f:
+                for url in self.pending_alive:
+                    f.write(url + "\n")
+            logger.info(f"Flushed {len(self.pending_alive)} alive URLs to {self.paths['alive']}")
+            self.pending_alive = []
+        save_checkpoint(self.paths["checkpoint"], self.paths["source_size"], self.next_index())
+
+    def record_alive(self, result: str) -> None:
+        final_url = result.rstrip('/')
+        if final_url in self.existing_urls:
+            logger.info(f"Duplicate in DB: {final_url}")
+            self.stats["dup"] += 1
+            return
+        if final_url in self.seen_urls:
+            logger.info(f"Duplicate in session: {final_url}")
+            self.stats["dup"] += 1
+            return
+
+        self.seen_urls.add(final_url)
+        self.pending_alive.append(final_url)
+        self.stats["alive"] += 1
+        logger.info(f"SAFE & ALIVE: {final_url}")
+
+    async def produce(self, dns_queue) -> None:
+        for idx, raw_line in enumerate(self.candidates):
+            if self.stop_event.is_set():
+                break
+            domain = candidate_domain(raw_line)
+            if not domain:
+                self.mark_done(idx)
+                continue
+            if not is_safe_keyword(domain):
+                self.stats["keyword"] += 1
+                self.mark_done(idx)
+                continue
+            await dns_queue.put((idx, domain))
+
+    async def dns_stage(self, resolver, dns_queue, live_queue) -> None:
+        while True:
+            idx, domain = await dns_queue.get()
+            forwarded = False
+            try:
+                if await resolver.is_safe(domain):
+                    await live_queue.put((idx, domain))
+                    forwarded = True
+                else:
+                    logger.warning(f"Blocked by Safe DNS: {domain}")
+                    self.stats["dns"] += 1
+            except Exception as exc:
+                logger.error(f"{domain} DNS check generated an exception: {exc}")
+                self.stats["dns"] += 1
+            finally:
+                if not forwarded:
+                    self.mark_done(idx)
+                dns_queue.task_done()
+
+    async def live_stage(self, executor, live_queue) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            idx, domain = await live_queue.get()
+            try:
+                result = await loop.run_in_executor(executor, check_liveness, domain)
+                if result:
+                    self.record_alive(result)
+                else:
+                    self.stats["dead"] += 1
+            except Exception as exc:
+                logger.error(f"{domain} generated an exception: {exc}")
+            finally:
+                self.mark_done(idx)
+                live_queue.task_done()
+
+    async def report(self, started: float) -> None:
+        while True:
+            await asyncio.sleep(self.args.checkpoint_interval)
+            self.flush()
+            elapsed = max(time.time() - started, 0.001)
+            checked = int(sum(self.done))
+            logger.info(
+                f"Progress: {checked}/{len(self.candidates)} "
+                f"({checked / elapsed:.1f}/s), resume point {self.next_index()} | "
+                f"alive {self.stats['alive']}, dup {self.stats['dup']}, "
+                f"dead {self.stats['dead']}, keyword {self.stats['keyword']}, "
+                f"dns {self.stats['dns']}"
+            )
+
+    async def run(self) -> None:
+        resolver = SafeDnsResolver(self.args.dns_server, self.args.dns_timeout)
+        await resolver.open()
+        dns_queue = asyncio.Queue(maxsize=self.args.dns_concurrency * 2)
+        live_queue = asyncio.Queue(maxsize=self.args.live_concurrency * 2)
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.args.live_concurrency, thread_name_prefix="live"
+        )
+
+        workers = [
+            asyncio.create_task(self.dns_stage(resolver, dns_queue, live_queue))
+            for _ in range(self.args.dns_concurrency)
+        ]
+        workers += [
+            asyncio.create_task(self.live_stage(executor, live_queue))
+            for _ in range(self.args.live_concurrency)
+        ]
+        workers.append(asyncio.create_task(self.report(time.time())))
+
+        async def drain():
+            await self.produce(dns_queue)
+            await dns_queue.join()
+            await live_queue.join()
+
+        drain_task = asyncio.create_task(drain())
+        try:
+            while not drain_task.done():
+                if self.stop_event.is_set():
+                    logger.warning("Stop event detected. Halting processing.")
+                    drain_task.cancel()
+                    break
+                await asyncio.sleep(0.2)
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(drain_task, *workers, return_exceptions=True)
+            resolver.close()
+            executor.shutdown(wait=False, cancel_futures=True)
+            self.flush()
+
 def main():
     parser = argparse.ArgumentParser(description="Check URLs for safety and liveness.")
     parser.add_argument("--limit", type=int, default=1000, help="Max number of URLs to process")
+    parser.add_argument("--dns-server", type=str, default="1.1.1.3",
+                        help="Filtering resolver used for the safe-DNS stage")
+    parser.add_argument("--dns-timeout", type=float, default=2.0)
+    parser.add_argument("--dns-concurrency", type=int, default=200)
+    parser.add_argument("--live-concurrency", type=int, default=100)
+    parser.add_argument("--checkpoint-interval", type=int, default=5,
+                        help="Seconds between alive-file flushes and checkpoint writes")
+    parser.add_argument("--prefilter", type=str, default="",
+                        help="Keyword-screen a large domain list (e.g. top-sites CSV), "
+                             "append survivors to url_new.txt and exit")
+    parser.add_argument("--merge", action="store_true",
+                        help="Append new URLs from url_alive.txt to url.txt and exit")
     args = parser.parse_args()
 
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     url_file = os.path.join(base_dir, "data", "url.txt")
     url_new_file = os.path.join(base_dir, "data", "url_new.txt")
     url_alive_file = os.path.join(base_dir, "data", "url_alive.txt")
+    checkpoint_file = os.path.join(base_dir, "data", "url_check.checkpoint")
+
+    if args.prefilter:
+        if not os.path.exists(args.prefilter):
+            logger.error(f"{args.prefilter} not found.")
+            return
+        prefilter_file(args.prefilter, url_new_file)
+        return
 
     stop_event = threading.Event()
     start_input_monitor(stop_event)
 
-    existing_urls = load_urls(url_file)
-    logger.info(f"Loaded {len(existing_urls)} existing URLs from {url_file}")
+    existing_urls = UrlIndex.for_corpus(url_file)
+    logger.info(f"Loaded index of {len(existing_urls)} existing URLs from {url_file}")
+
+    if args.merge:
+        merge_into_corpus(url_alive_file, url_file, existing_urls)
+        existing_urls.close()
+        return
 
     if not os.path.exists(url_new_file):
         logger.error(f"{url_new_file} not found.")
@@ -154,69 +434,41 @@ def main():
         with open(url_alive_file, 'w', encoding='utf-8') as f:
             pass
 
-    unique_alive_urls = set()
-
-    limit = min(args.limit, len(all_candidates))
-    candidates_to_process = all_candidates[:limit]
-    remaining_candidates = all_candidates[limit:]
+    source_size = os.path.getsize(url_new_file)
+    start = min(load_checkpoint(checkpoint_file, source_size), len(all_candidates))
+    if start:
+        logger.info(f"Resuming from checkpoint at candidate {start}")
 
+    limit = min(args.limit, len(all_candidates) - start)
     logger.info(f"Will process {limit} URLs (Limit: {args.limit})")
 
-    batch_size = 100
-    processed_count = 0
-
-    for i in range(0, len(candidates_to_process), batch_size):
-        if stop_event.is_set():
-            logger.warning("Stop event detected. Halting processing.")
-            remaining_candidates = candidates_to_process[i:] + remaining_candidates
-            break
-
-        batch = candidates_to_process[i : i + batch_size]
-        logger.info(f"Processing batch {i // batch_size + 1} ({len(batch)} URLs)...")
-
-        alive_in_batch = []
-
-        with concurrent.futures.ThreadPoolExecutor(max_workers=30) as executor:
-            future_to_url = {executor.submit(process_candidate, url): url for url in batch}
-
-            for future in concurrent.futures.as_completed(future_to_url):
-                if stop_event.is_set():
-                    executor.shutdown(wait=False, cancel_futures=True)
-                    break
-
-                url = future_to_url[future]
-                try:
-                    result = future.result()
-                    if result:
-                        final_url = result.rstrip('/')
-
-                        if final_url in existing_urls:
-                            logger.info(f"Duplicate in DB: {final_url}")
-                            continue
-
-                        if final_url in unique_alive_urls:
-                            logger.info(f"Duplicate in session: {final_url}")
-                            continue
-
-                        unique_alive_urls.add(final_url)
-                        alive_in_batch.append(final_url)
-                        logger.info(f"SAFE & ALIVE: {final_url}")
-                except Exception as exc:
-                    logger.error(f"{url} generated an exception: {exc}")
-
-        if alive_in_batch:
-            with open(url_alive_file, 'a', encoding='utf-8') as f:
-                for v_url in alive_in_batch:
-                    f.write(v_url + "\n")
-            logger.info(f"Flushed {len(alive_in_batch)} alive URLs to {url_alive_file}")
+    paths = {
+        "alive": url_alive_file,
+        "checkpoint": checkpoint_file,
+        "source_size": source_size,
+    }
+    pipeline = UrlCheckPipeline(
+        all_candidates[start:start + limit], start, args, paths, existing_urls, stop_event
+    )
+    try:
+        asyncio.run(pipeline.run())
+    except KeyboardInterrupt:
+        logger.warning("Interrupted. Checkpoint kept for resume.")
+        return
+    finally:
+        existing_urls.close()
 
-        processed_count += len(batch)
+    processed_count = pipeline.next_index() - start
+    remaining_candidates = all_candidates[pipeline.next_index():]
 
     logger.info(f"Updating {url_new_file}...")
     with open(url_new_file, 'w', encoding='utf-8') as f:
         for url in remaining_candidates:
             f.write(url + "\n")
 
+    if os.path.exists(checkpoint_file):
+        os.remove(checkpoint_file)
+
     logger.info(f"Done. Processed {processed_count} URLs. Remaining: {len(remaining_candidates)}")
 
 if __name__ == "__main__":
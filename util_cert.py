@@ -1,42 +1,99 @@
 import OpenSSL.crypto as crypto
 import socket
 import ssl
+import time
 import logging
-from util_traffic import get_hostname_from_url
+import threading
+import concurrent.futures
+from util_url_store import url_record
 
 logger = logging.getLogger()
 
-def check_url_cert(url: str) -> str:
+ISSUER_TTL = 300
+
+def fetch_issuer(hostname: str, port: int = 443, timeout: float = 5) -> str:
+    ctx = ssl.create_default_context()
+    ctx.check_hostname = False
+    ctx.verify_mode = ssl.CERT_NONE
+    with socket.create_connection((hostname, port), timeout=timeout) as raw:
+        with ctx.wrap_socket(raw, server_hostname=hostname) as s:
+            cert_bin = s.getpeercert(True)
+    x509 = crypto.load_certificate(crypto.FILETYPE_ASN1, cert_bin)
+    issuer = x509.get_issuer()
+
+    components = []
+    for k, v in issuer.get_components():
+        key = k.decode()
+        val = v.decode()
+        if key in ['emailAddress', 'CN']:
+            components.append(f"{key}={val}")
+    return ", ".join(components)
+
+class IssuerCache:
+    def __init__(self, ttl: int = ISSUER_TTL):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = {}
+
+    def get(self, hostname: str) -> str | None:
+        with self.lock:
+            entry = self.entries.get(hostname)
+            if entry and entry[1] > time.time():
+                return entry[0]
+        return None
+
+    def put(self, hostname: str, issuer: str) -> None:
+        with self.lock:
+            self.entries[hostname] = (issuer, time.time() + self.ttl)
+            if len(self.entries) > 10000:
+                now = time.time()
+                self.entries = {h: e for h, e in self.entries.items() if e[1] > now}
+
+_issuer_cache = IssuerCache()
+
+def _host_issuer(hostname: str, cache, refresh: bool) -> str:
+    if not refresh:
+        issuer = cache.get(hostname)
+        if issuer is not None:
+            logger.info(f"Cert Issuer for {hostname}: {issuer} (cached)")
+            return issuer
     try:
-        hostname = get_hostname_from_url(url)
+        issuer = fetch_issuer(hostname)
+    except Exception as e:
+        logger.error(f"Error checking cert for {hostname}: {e}")
+        return ""
+    logger.info(f"Cert Issuer for {hostname}: {issuer}")
+    cache.put(hostname, issuer)
+    return issuer
+
+def check_url_cert(url: str, refresh: bool = False) -> str:
+    hostname = url_record(url).host
+    if not hostname:
+        logger.error(f"Could not extract hostname from {url}")
+        return ""
+    return _host_issuer(hostname, _issuer_cache, refresh)
 
+def check_url_certs(urls, concurrency: int = 16, refresh: bool = False) -> dict:
+    hosts = {}
+    for url in urls:
+        hostname = url_record(url).host
         if not hostname:
             logger.error(f"Could not extract hostname from {url}")
-            return ""
-
-        dst = (hostname, 443)
-        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        s.settimeout(5)
-        s.connect(dst)
-        ctx = ssl.create_default_context()
-        ctx.check_hostname = False
-        ctx.verify_mode = ssl.CERT_NONE
-        s = ctx.wrap_socket(s, server_hostname=dst[0])
-        cert_bin = s.getpeercert(True)
-        x509 = crypto.load_certificate(crypto.FILETYPE_ASN1, cert_bin)
-        issuer = x509.get_issuer()
-
-        components = []
-        for k, v in issuer.get_components():
-            key = k.decode()
-            val = v.decode()
-            if key in ['emailAddress', 'CN']:
-                components.append(f"{key}={val}")
-
-        issuer_str = ", ".join(components)
-        logger.info(f"Cert Issuer for {hostname}: {issuer_str}")
-
-        return issuer_str
-    except Exception as e:
-        logger.error(f"Error checking cert for {url}: {e}")
-        return ""
+        hosts.setdefault(hostname, []).append(url)
+
+    results = {url: "" for url in hosts.pop("", [])}
+    if not hosts:
+        return results
+
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=min(concurrency, len(hosts)), thread_name_prefix="cert"
+    ) as exe:
+        futures = {
+            exe.submit(_host_issuer, hostname, _issuer_cache, refresh): hostname
+            for hostname in hosts
+        }
+        for future in concurrent.futures.as_completed(futures):
+            issuer = future.result()
+            for url in hosts[futures[future]]:
+                results[url] = issuer
+    return results
@@ -2,8 +2,9 @@ import os
 import shutil
 import json
 import logging
+import re
 import fnmatch
-from util_traffic import get_hostname_from_url
+from util_url_store import url_record
 
 logger = logging.getLogger()
 
@@ -26,11 +27,15 @@ class AgentConfigManager:
             self.stagent_root, "data", "nsexception.json"
         )
         self.exception_names = []
+        self.exception_re = None
+        self.exception_version = 0
         self.gateway_hosts = []
         self.failclose_active = False
 
     def load_nsexception(self):
         self.exception_names = []
+        self.exception_re = None
+        self.exception_version += 1
         if not os.path.exists(self.exception_path):
             logger.warning(f"nsexception.json not found at {self.exception_path}")
             return
@@ -49,6 +54,7 @@ class AgentConfigManager:
                     if isinstance(names, list):
                         self.exception_names.extend(names)
 
+            self.exception_re = self._compile_exceptions(self.exception_names)
             logger.info(
                 f"Loaded {len(self.exception_names)} exception patterns "
                 f"from {self.exception_path}"
@@ -56,27 +62,34 @@ class AgentConfigManager:
         except Exception as e:
             logger.error(f"Failed to load nsexception.json: {e}")
 
+    @staticmethod
+    def _compile_exceptions(names) -> re.Pattern | None:
+        alternatives = []
+        for name in names:
+            if not isinstance(name, str) or not name:
+                continue
+            pattern = name.lower()
+            alternatives.append(fnmatch.translate(pattern))
+            if pattern.startswith("*."):
+                alternatives.append(re.escape(pattern[2:]))
+            if '*' not in pattern:
+                alternatives.append(r".*\." + re.escape(pattern))
+        if not alternatives:
+            return None
+        return re.compile("|".join(f"(?:{alt})" for alt in alternatives))
+
     def url_in_nsexception(self, url: str) -> bool:
         try:
-            host = get_hostname_from_url(url)
-            if not host:
-                return False
-
-            host = host.lower()
-
-            for pattern in self.exception_names:
-                pattern = pattern.lower()
-
-                if fnmatch.fnmatch(host, pattern):
-                    return True
-
-                if pattern.startswith("*.") and host == pattern[2:]:
-                    return True
-
-                if '*' not in pattern and host.endswith('.' + pattern):
-                    return True
-
-            return False
+            record = url_record(url)
+            if record.exception_version == self.exception_version:
+                return record.in_exception
+
+            verdict = False
+            if record.host and self.exception_re:
+                verdict = self.exception_re.fullmatch(record.host) is not None
+            record.in_exception = verdict
+            record.exception_version = self.exception_version
+            return verdict
         except Exception:
             return False
 
@@ -1,11 +1,18 @@
+import os
 import threading
 import time
-import msvcrt
 import logging
 
+if os.name == "nt":
+    import msvcrt
+
 logger = logging.getLogger()
 
 def start_input_monitor(stop_event: threading.Event) -> None:
+    if os.name != "nt":
+        logger.info("Press Ctrl+C to stop.")
+        return
+
     def _monitor():
         logger.info("Input monitor started. Press ESC or Ctrl+C to stop.")
         while not stop_event.is_set():
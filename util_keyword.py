@@ -0,0 +1,69 @@
+from collections import deque
+
+class KeywordMatcher:
+    def __init__(self, keywords, ignore_case: bool = True):
+        self.ignore_case = ignore_case
+        goto = [{}]
+        fail = [0]
+        output = [None]
+
+        for keyword in keywords:
+            if not keyword:
+                continue
+            if ignore_case:
+                keyword = keyword.lower()
+            state = 0
+            for ch in keyword:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    goto.append({})
+                    fail.append(0)
+                    output.append(None)
+                    nxt = len(goto) - 1
+                    goto[state][ch] = nxt
+                state = nxt
+            if output[state] is None:
+                output[state] = keyword
+
+        order = []
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            order.append(state)
+            for ch, nxt in goto[state].items():
+                link = fail[state]
+                while link and ch not in goto[link]:
+                    link = fail[link]
+                target = goto[link].get(ch, 0)
+                fail[nxt] = target if target != nxt else 0
+                if output[nxt] is None:
+                    output[nxt] = output[fail[nxt]]
+                queue.append(nxt)
+
+        delta = [None] * len(goto)
+        delta[0] = dict(goto[0])
+        for state in order:
+            table = dict(delta[fail[state]])
+            table.update(goto[state])
+            delta[state] = table
+
+        self.delta = delta
+        self.output = output
+
+    def find(self, text: str) -> str | None:
+        if self.ignore_case:
+            text = text.lower()
+        delta = self.delta
+        output = self.output
+        state = 0
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if output[state] is not None:
+                return output[state]
+        return None
+
+    def contains_any(self, text: str) -> bool:
+        return self.find(text) is not None
+
+    def __len__(self) -> int:
+        return len(self.delta)
@@ -0,0 +1,120 @@
+import time
+import logging
+import statistics
+import threading
+from collections import deque
+
+logger = logging.getLogger()
+
+MB = 1024 * 1024
+
+def theil_sen(points, max_points: int = 200) -> tuple[float, float]:
+    if len(points) > max_points:
+        step = len(points) / max_points
+        points = [points[int(i * step)] for i in range(max_points)]
+
+    slopes = []
+    for i, (x1, y1) in enumerate(points):
+        for x2, y2 in points[i + 1:]:
+            if x2 != x1:
+                slopes.append((y2 - y1) / (x2 - x1))
+    if not slopes:
+        return 0.0, 0.0
+    rising = sum(1 for s in slopes if s > 0) / len(slopes)
+    return statistics.median(slopes), rising
+
+class LeakDetector:
+    CONSISTENCY = 0.6
+
+    def __init__(
+        self,
+        window_sec: int = 3600,
+        private_mb_per_hour: float = 50,
+        handles_per_hour: float = 1000,
+        iter_window: int = 20,
+        private_mb_per_iter: float = 5,
+        handles_per_iter: float = 50
+    ):
+        self.window_sec = window_sec
+        self.min_span = window_sec / 4
+        self.resolution = max(1.0, window_sec / 360)
+        self.mem_per_hour = private_mb_per_hour * MB
+        self.handles_per_hour = handles_per_hour
+        self.iter_window = iter_window
+        self.mem_per_iter = private_mb_per_iter * MB
+        self.handles_per_iter = handles_per_iter
+        self.lock = threading.Lock()
+        self.instance = None
+        self.points = deque()
+        self.iterations = deque(maxlen=iter_window)
+        self.last_alert = {}
+
+    def _check_instance(self, instance) -> None:
+        if instance != self.instance:
+            if self.instance is not None:
+                logger.info("Leak detector: process restarted, trend windows reset.")
+            self.instance = instance
+            self.points.clear()
+            self.iterations.clear()
+
+    def add_sample(self, ts: float, private: int, handles: int, instance=None) -> None:
+        bucket = ts - ts % self.resolution
+        with self.lock:
+            self._check_instance(instance)
+            if self.points and self.points[-1][0] == bucket:
+                _, mem_min, handles_min = self.points[-1]
+                self.points[-1] = (bucket, min(mem_min, private), min(handles_min, handles))
+            else:
+                self.points.append((bucket, private, handles))
+            while self.points and self.points[0][0] < bucket - self.window_sec:
+                self.points.popleft()
+
+    def end_iteration(self, iteration: int, private: int, handles: int, instance=None) -> None:
+        with self.lock:
+            self._check_instance(instance)
+            self.iterations.append((iteration, private, handles))
+
+    def _alert(self, key: str, message: str, findings: list) -> None:
+        now = time.time()
+        if now - self.last_alert.get(key, 0) < self.window_sec:
+            return
+        self.last_alert[key] = now
+        findings.append(message)
+
+    def check(self) -> list[str]:
+        with self.lock:
+            points = list(self.points)
+            iterations = list(self.iterations)
+
+        findings = []
+        if len(points) >= 10 and points[-1][0] - points[0][0] >= self.min_span:
+            hours = 3600.0
+            mem_slope, mem_rising = theil_sen([(p[0], p[1]) for p in points])
+            if mem_slope * hours > self.mem_per_hour and mem_rising >= self.CONSISTENCY:
+                self._alert("mem_time", (
+                    f"private bytes rising {mem_slope * hours / MB:.1f}MB/h over "
+                    f"{(points[-1][0] - points[0][0]) / 60:.0f}min "
+                    f"(threshold {self.mem_per_hour / MB:.0f}MB/h)"
+                ), findings)
+            h_slope, h_rising = theil_sen([(p[0], p[2]) for p in points])
+            if h_slope * hours > self.handles_per_hour and h_rising >= self.CONSISTENCY:
+                self._alert("handles_time", (
+                    f"handles rising {h_slope * hours:.0f}/h over "
+                    f"{(points[-1][0] - points[0][0]) / 60:.0f}min "
+                    f"(threshold {self.handles_per_hour:.0f}/h)"
+                ), findings)
+
+        if len(iterations) >= self.iter_window:
+            mem_slope, mem_rising = theil_sen([(i[0], i[1]) for i in iterations])
+            if mem_slope > self.mem_per_iter and mem_rising >= self.CONSISTENCY:
+                self._alert("mem_iter", (
+                    f"private bytes rising {mem_slope / MB:.2f}MB/iteration over the last "
+                    f"{len(iterations)} iterations (threshold {self.mem_per_iter / MB:g}MB)"
+                ), findings)
+            h_slope, h_rising = theil_sen([(i[0], i[2]) for i in iterations])
+            if h_slope > self.handles_per_iter and h_rising >= self.CONSISTENCY:
+                self._alert("handles_iter", (
+                    f"handles rising {h_slope:.1f}/iteration over the last "
+                    f"{len(iterations)} iterations (threshold {self.handles_per_iter:g})"
+                ), findings)
+        return findings
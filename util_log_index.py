@@ -0,0 +1,117 @@
+import os
+import re
+import mmap
+import json
+import bisect
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+TS_RE = re.compile(rb'(\d{4})/(\d{2})/(\d{2}) (\d{2}):(\d{2}):(\d{2})')
+
+def _parse_ts(match) -> float:
+    try:
+        return datetime(*(int(g) for g in match.groups())).timestamp()
+    except ValueError:
+        return 0.0
+
+class LogTimeIndex:
+    STRIDE = 256 * 1024
+    PROBE = 4096
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.files = {}
+        self.dirty = False
+
+    def load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.files = {int(k): v for k, v in data.items()}
+        except Exception as e:
+            logger.error(f"Failed to load log time index {self.path}: {e}")
+            self.files = {}
+
+    def save(self, live_inodes=None) -> None:
+        with self.lock:
+            if live_inodes is not None:
+                for inode in list(self.files):
+                    if inode not in live_inodes:
+                        del self.files[inode]
+                        self.dirty = True
+            if not self.dirty:
+                return
+            tmp_path = self.path + ".tmp"
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.files, f, separators=(',', ':'))
+                os.replace(tmp_path, self.path)
+                self.dirty = False
+            except OSError as e:
+                logger.error(f"Failed to save log time index {self.path}: {e}")
+
+    def update(self, filepath: str, min_growth: int = 0) -> dict | None:
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            return None
+
+        with self.lock:
+            entry = self.files.get(st.st_ino)
+            if entry and entry["indexed"] <= st.st_size < entry["indexed"] + min_growth:
+                return entry
+            if entry is None or st.st_size < entry["indexed"]:
+                entry = {"indexed": 0, "points": []}
+                self.files[st.st_ino] = entry
+            if st.st_size > entry["indexed"]:
+                self._extend(filepath, entry, st.st_size)
+                self.dirty = True
+            return entry
+
+    def _extend(self, filepath: str, entry: dict, size: int) -> None:
+        points = entry["points"]
+        pos = entry["indexed"]
+        if points:
+            pos = max(pos, points[-1][1] + self.STRIDE)
+        try:
+            with open(filepath, 'rb') as f, \
+                    mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as mm:
+                while pos < size:
+                    if pos:
+                        newline = mm.find(b'\n', pos - 1, min(size, pos + self.PROBE))
+                        if newline == -1:
+                            pos += self.STRIDE
+                            continue
+                        pos = newline + 1
+                    match = TS_RE.search(mm, pos, min(size, pos + self.PROBE))
+                    if match:
+                        ts = _parse_ts(match)
+                        if ts and (not points or ts >= points[-1][0]):
+                            points.append([ts, pos])
+                    pos += self.STRIDE
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to index log {filepath}: {e}")
+            return
+        entry["indexed"] = size
+
+    def seek(self, filepath: str, target_ts: float) -> tuple[bool | None, int, int]:
+        try:
+            inode = os.stat(filepath).st_ino
+        except OSError:
+            return None, 0, 0
+
+        entry = self.update(filepath)
+        if not entry or not entry["points"]:
+            return None, 0, inode
+
+        points = entry["points"]
+        idx = bisect.bisect_left([p[0] for p in points], target_ts)
+        if idx == 0:
+            return False, 0, inode
+        return True, points[idx - 1][1], inode
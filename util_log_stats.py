@@ -0,0 +1,148 @@
+import re
+import json
+import time
+import logging
+import threading
+from collections import Counter
+from datetime import datetime
+
+logger = logging.getLogger()
+
+STATS_MARKERS = (b" error ", b" warn ", b" warning ", b" ERROR ", b" WARN ", b" WARNING ")
+LEVEL_RE = re.compile(r" (error|warn|warning) ", re.IGNORECASE)
+NOISE_RE = re.compile(r"0x[0-9a-fA-F]+|\d+(?:[.:]\d+)*")
+SPACE_RE = re.compile(r"\s+")
+
+TUNNEL, BYPASS, ERROR, WARN = range(4)
+
+def signature(message: str, limit: int = 120) -> str:
+    message = NOISE_RE.sub("#", message)
+    return SPACE_RE.sub(" ", message).strip()[:limit]
+
+class LogStats:
+    LATENESS = 5
+    MAX_SIGNATURES = 500
+
+    def __init__(self, path: str, flush_interval: int = 10):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.buckets = {}
+        self.procs = Counter()
+        self.sigs = Counter()
+        self.total_procs = Counter()
+        self.total_sigs = Counter()
+        self.totals = [0, 0, 0, 0]
+        self.peak = (0, 0)
+        self.newest = 0
+        self.last_flush = time.time()
+        self.closed = False
+        self._ts_prefix = None
+        self._ts = 0
+
+    def _timestamp(self, line: str) -> int:
+        prefix = line[:19]
+        if prefix != self._ts_prefix:
+            try:
+                self._ts = int(datetime.strptime(prefix, "%Y/%m/%d %H:%M:%S").timestamp())
+            except ValueError:
+                return int(time.time())
+            self._ts_prefix = prefix
+        return self._ts
+
+    def add(self, line: str, flow=None) -> None:
+        if flow is None:
+            match = LEVEL_RE.search(line)
+            if match is None:
+                return
+            kind = ERROR if match.group(1).lower() == "error" else WARN
+            sig = f"{match.group(1).lower()}: {signature(line[match.end():])}"
+        else:
+            kind = TUNNEL if flow[2] == "tunnel" else BYPASS
+
+        ts = self._timestamp(line)
+        with self.lock:
+            bucket = self.buckets.get(ts)
+            if bucket is None:
+                bucket = self.buckets[ts] = [0, 0, 0, 0]
+            bucket[kind] += 1
+            self.newest = max(self.newest, ts)
+            if flow is not None:
+                self.procs[flow[0]] += 1
+            elif sig in self.sigs or len(self.sigs) < self.MAX_SIGNATURES:
+                self.sigs[sig] += 1
+            else:
+                self.sigs["(other)"] += 1
+
+    def maybe_flush(self) -> None:
+        if time.time() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self, final: bool = False) -> None:
+        with self.lock:
+            self.last_flush = time.time()
+            cutoff = self.newest if final else self.newest - self.LATENESS
+            secs = sorted(s for s in self.buckets if s <= cutoff)
+            if not secs and not (final and (self.procs or self.sigs)):
+                return
+
+            rows = [self.buckets.pop(s) for s in secs]
+            record = {
+                "t0": secs[0] if secs else 0,
+                "dt": [s - secs[0] for s in secs],
+                "tunnel": [r[TUNNEL] for r in rows],
+                "bypass": [r[BYPASS] for r in rows],
+                "error": [r[ERROR] for r in rows],
+                "warn": [r[WARN] for r in rows],
+                "proc": dict(self.procs),
+                "sig": dict(self.sigs),
+            }
+            for s, row in zip(secs, rows):
+                for i, n in enumerate(row):
+                    self.totals[i] += n
+                if row[TUNNEL] > self.peak[0]:
+                    self.peak = (row[TUNNEL], s)
+            self.total_procs.update(self.procs)
+            self.total_sigs.update(self.sigs)
+            self.procs.clear()
+            self.sigs.clear()
+
+            try:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, separators=(',', ':')) + "\n")
+            except OSError as e:
+                logger.error(f"Failed to write log metrics {self.path}: {e}")
+
+    def summary(self) -> str:
+        tunnel, bypass, errors, warns = self.totals
+        top = ", ".join(f"{p} {n}" for p, n in self.total_procs.most_common(3)) or "-"
+        return (
+            f"nsdebuglog: {tunnel} tunneled (peak {self.peak[0]}/s), {bypass} bypassed, "
+            f"{errors} errors, {warns} warnings | top: {top}"
+        )
+
+    def close(self) -> None:
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+        self.flush(final=True)
+        with self.lock:
+            record = {
+                "summary": {
+                    "tunnel": self.totals[TUNNEL],
+                    "bypass": self.totals[BYPASS],
+                    "error": self.totals[ERROR],
+                    "warn": self.totals[WARN],
+                    "peak_tunnel": self.peak[0],
+                    "peak_at": self.peak[1],
+                    "proc": dict(self.total_procs.most_common(20)),
+                    "sig": dict(self.total_sigs.most_common(50)),
+                }
+            }
+            try:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, separators=(',', ':')) + "\n")
+            except OSError as e:
+                logger.error(f"Failed to write log metrics {self.path}: {e}")
+        logger.info(self.summary())
@@ -1,8 +1,16 @@
 import ctypes
 from ctypes import wintypes
+import argparse
 import time
 import os
+import logging
+import threading
+from abc import ABC, abstractmethod
 from datetime import datetime
+import psutil
+from util_timeseries import TimeSeriesStore
+
+logger = logging.getLogger()
 
 TH32CS_SNAPPROCESS = 0x00000002
 INVALID_HANDLE_VALUE = ctypes.c_void_p(-1).value
@@ -11,6 +19,8 @@ SE_DEBUG_NAME = "SeDebugPrivilege"
 TOKEN_ADJUST_PRIVILEGES = 0x0020
 TOKEN_QUERY = 0x0008
 SE_PRIVILEGE_ENABLED = 0x00000002
+STILL_ACTIVE = 259
+RESOURCE_HEADER = "Timestamp, CPU, Memory(MB), Memory(KB), Handles, Threads\n"
 
 class MEMORYSTATUSEX(ctypes.Structure):
     _fields_ = [
@@ -139,6 +149,8 @@ def _get_num_processors() -> int:
     return sys_info.dwNumberOfProcessors
 
 def get_system_memory_usage() -> float:
+    if os.name != "nt":
+        return psutil.virtual_memory().percent / 100.0
     mem_status = MEMORYSTATUSEX()
     mem_status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
     ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(mem_status))
@@ -172,6 +184,50 @@ def get_pid_by_name(process_name: str) -> int:
 
     return target_pid
 
+def _memory_usage(process_handle) -> int:
+    counters = PROCESS_MEMORY_COUNTERS_EX()
+    counters.cb = ctypes.sizeof(PROCESS_MEMORY_COUNTERS_EX)
+
+    success = ctypes.windll.psapi.GetProcessMemoryInfo(
+        process_handle,
+        ctypes.byref(counters),
+        ctypes.sizeof(counters)
+    )
+    return counters.PrivateUsage if success else 0
+
+def _handle_count(process_handle) -> int:
+    count = wintypes.DWORD()
+    success = ctypes.windll.kernel32.GetProcessHandleCount(
+        process_handle, ctypes.byref(count)
+    )
+    return count.value if success else 0
+
+def _process_times(process_handle) -> tuple[int, int] | None:
+    creation = FILETIME()
+    exit_time = FILETIME()
+    kernel = FILETIME()
+    user = FILETIME()
+    if not ctypes.windll.kernel32.GetProcessTimes(
+        process_handle,
+        ctypes.byref(creation),
+        ctypes.byref(exit_time),
+        ctypes.byref(kernel),
+        ctypes.byref(user)
+    ):
+        return None
+    return _filetime_to_int(creation), _filetime_to_int(kernel) + _filetime_to_int(user)
+
+def _is_running(process_handle) -> bool:
+    code = wintypes.DWORD()
+    if not ctypes.windll.kernel32.GetExitCodeProcess(process_handle, ctypes.byref(code)):
+        return False
+    return code.value == STILL_ACTIVE
+
+def _system_time() -> int:
+    now = FILETIME()
+    ctypes.windll.kernel32.GetSystemTimeAsFileTime(ctypes.byref(now))
+    return _filetime_to_int(now)
+
 def get_process_memory_usage(pid: int) -> int:
     if pid == 0:
         return 0
@@ -187,19 +243,7 @@ def get_process_memory_usage(pid: int) -> int:
         return 0
 
     try:
-        counters = PROCESS_MEMORY_COUNTERS_EX()
-        counters.cb = ctypes.sizeof(PROCESS_MEMORY_COUNTERS_EX)
-
-        success = ctypes.windll.psapi.GetProcessMemoryInfo(
-            process_handle,
-            ctypes.byref(counters),
-            ctypes.sizeof(counters)
-        )
-
-        if success:
-            return counters.PrivateUsage
-        else:
-            return 0
+        return _memory_usage(process_handle)
     finally:
         k32.CloseHandle(process_handle)
 
@@ -216,11 +260,7 @@ def get_process_handle_count(pid: int) -> int:
         return 0
 
     try:
-        count = wintypes.DWORD()
-        success = k32.GetProcessHandleCount(
-            process_handle, ctypes.byref(count)
-        )
-        return count.value if success else 0
+        return _handle_count(process_handle)
     finally:
         k32.CloseHandle(process_handle)
 
@@ -284,20 +324,218 @@ def get_process_cpu_usage(pid: int, interval: float = 0.5) -> float:
     finally:
         k32.CloseHandle(process_handle)
 
+class ProcessProbe(ABC):
+    def __init__(self, process_name: str, pid: int = 0):
+        self.process_name = process_name
+        self.fixed_pid = pid
+        self.pid = 0
+        self.creation = 0
+        self.last_cpu = None
+        self.num_procs = os.cpu_count() or 1
+        self.lock = threading.Lock()
+
+    def primed(self) -> bool:
+        return self.last_cpu is not None
+
+    @abstractmethod
+    def _find_pid(self) -> int:
+        ...
+
+    @abstractmethod
+    def _read(self, pid: int):
+        ...
+
+    def sample(self) -> tuple[float, int, int, int] | None:
+        with self.lock:
+            stats = self._read(self.pid) if self.pid else None
+            if stats is None or stats[0] != self.creation:
+                self.last_cpu = None
+                self.pid = self.fixed_pid or self._find_pid()
+                stats = self._read(self.pid) if self.pid else None
+                if stats is None:
+                    self.pid = 0
+                    return None
+                self.creation = stats[0]
+
+            _, cpu_time, mem_bytes, handles, threads = stats
+            now = time.time()
+            cpu_pct = 0.0
+            if self.last_cpu:
+                wall_delta = now - self.last_cpu[1]
+                if wall_delta > 0:
+                    cpu_pct = max(
+                        0.0, (cpu_time - self.last_cpu[0]) / wall_delta * 100.0 / self.num_procs
+                    )
+            self.last_cpu = (cpu_time, now)
+            return cpu_pct, mem_bytes, handles, threads
+
+class Win32Probe(ProcessProbe):
+    def __init__(self, process_name: str, pid: int = 0):
+        super().__init__(process_name, pid)
+        self.num_procs = _get_num_processors()
+
+    def _find_pid(self) -> int:
+        return get_pid_by_name(self.process_name)
+
+    def _read(self, pid: int):
+        k32 = ctypes.windll.kernel32
+        handle = k32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return None
+        try:
+            times = _process_times(handle)
+            if times is None or not _is_running(handle):
+                return None
+            try:
+                threads = psutil.Process(pid).num_threads()
+            except psutil.Error:
+                threads = 0
+            return (
+                times[0], times[1] / 1e7,
+                _memory_usage(handle), _handle_count(handle), threads
+            )
+        finally:
+            k32.CloseHandle(handle)
+
+class PsutilProbe(ProcessProbe):
+    def __init__(self, process_name: str, pid: int = 0):
+        super().__init__(process_name, pid)
+        self.proc = None
+
+    def _find_pid(self) -> int:
+        target = self.process_name.lower()
+        for proc in psutil.process_iter(['pid', 'name']):
+            if (proc.info['name'] or "").lower() == target:
+                return proc.info['pid']
+        return 0
+
+    def _read(self, pid: int):
+        try:
+            if self.proc is None or self.proc.pid != pid:
+                self.proc = psutil.Process(pid)
+            proc = self.proc
+            with proc.oneshot():
+                if proc.status() == psutil.STATUS_ZOMBIE:
+                    return None
+                times = proc.cpu_times()
+                mem = proc.memory_info()
+                private = getattr(mem, 'private', 0) or getattr(mem, 'data', 0) or mem.rss
+                if hasattr(proc, 'num_handles'):
+                    handles = proc.num_handles()
+                else:
+                    handles = proc.num_fds()
+                return (
+                    proc.create_time(), times.user + times.system,
+                    private, handles, proc.num_threads()
+                )
+        except psutil.Error:
+            self.proc = None
+            return None
+
+BACKENDS = {"win32": Win32Probe, "psutil": PsutilProbe}
+DEFAULT_BACKEND = "win32" if os.name == "nt" else "psutil"
+
+_backend = DEFAULT_BACKEND
+_probes = {}
+_samplers = {}
+_probes_lock = threading.Lock()
+
+def set_resource_backend(name: str) -> str:
+    global _backend
+    if name == "auto":
+        name = DEFAULT_BACKEND
+    if name not in BACKENDS:
+        logger.warning(f"Unknown resource backend '{name}'. Using {DEFAULT_BACKEND}.")
+        name = DEFAULT_BACKEND
+    with _probes_lock:
+        if name != _backend:
+            _backend = name
+            _probes.clear()
+    return name
+
+def get_probe(process_name: str, pid: int = 0) -> ProcessProbe:
+    key = (process_name, pid)
+    with _probes_lock:
+        probe = _probes.get(key)
+        if probe is None:
+            probe = _probes[key] = BACKENDS[_backend](process_name, pid)
+        return probe
+
+def _format_resource_line(ts: str, cpu_percent, mem_bytes, handle_count, threads) -> str:
+    return (
+        f"{ts}, {cpu_percent:.0f}%, "
+        f"{mem_bytes / (1024 * 1024):.1f}MB, {mem_bytes / 1024:.0f}KB, "
+        f"{handle_count}, {threads}\n"
+    )
+
+class ResourceSampler:
+    def __init__(
+        self, process_name: str, log_dir: str, hz: float = 1, pid: int = 0, on_sample=None
+    ):
+        self.process_name = process_name
+        self.on_sample = on_sample
+        self.probe = get_probe(process_name, pid)
+        self.base_path = os.path.join(log_dir, f"{process_name}_samples")
+        self.store = TimeSeriesStore(self.base_path)
+        self.interval = 1.0 / hz
+        self.latest = None
+        self.peak_cpu = 0.0
+        self.samples = 0
+
+    def run(self, stop_event) -> None:
+        logger.info(
+            f"Resource Sampler Thread Started ({self.process_name}, "
+            f"{1.0 / self.interval:g} Hz)."
+        )
+        _samplers[self.process_name] = self
+
+        try:
+            next_tick = time.monotonic()
+            while not stop_event.is_set():
+                result = self.probe.sample()
+                if result is None:
+                    self.latest = None
+                else:
+                    self.latest = result
+                    self.samples += 1
+                    self.peak_cpu = max(self.peak_cpu, result[0])
+                    ts = time.time()
+                    self.store.append(ts, *result)
+                    if self.on_sample:
+                        self.on_sample(ts, result, self.probe.creation)
+
+                now = time.monotonic()
+                next_tick += self.interval
+                if next_tick < now:
+                    next_tick = now
+                stop_event.wait(next_tick - now)
+        finally:
+            _samplers.pop(self.process_name, None)
+            self.store.close()
+        logger.info(
+            f"Resource Sampler Thread Stopped ({self.samples} samples, "
+            f"peak CPU {self.peak_cpu:.0f}%)."
+        )
+
+    def close(self) -> None:
+        self.store.close()
+
 def log_resource_usage(
     process_name: str,
     log_dir="log"
 ) -> bool:
-    pid = get_pid_by_name(process_name)
-    if pid == 0:
-        return False
-
-    mem_bytes = get_process_memory_usage(pid)
-    mem_kb = mem_bytes / 1024
-    mem_mb = mem_bytes / (1024 * 1024)
-
-    handle_count = get_process_handle_count(pid)
-    cpu_percent = get_process_cpu_usage(pid, interval=0.5)
+    sampler = _samplers.get(process_name)
+    if sampler and sampler.latest:
+        result = sampler.latest
+    else:
+        probe = get_probe(process_name)
+        if not probe.primed():
+            if probe.sample() is None:
+                return False
+            time.sleep(0.5)
+        result = probe.sample()
+        if result is None:
+            return False
 
     if not os.path.exists(log_dir):
         os.makedirs(log_dir)
@@ -308,24 +546,34 @@ def log_resource_usage(
 
     write_header = not os.path.exists(full_path)
 
-    log_line = (
-        f"{now_str}, {cpu_percent:.0f}%, "
-        f"{mem_mb:.1f}MB, {mem_kb:.0f}KB, {handle_count}\n"
-    )
-
     with open(full_path, "a", encoding='utf-8') as f:
         if write_header:
-            f.write("Timestamp, CPU, Memory(MB), Memory(KB), Handles\n")
-        f.write(log_line)
+            f.write(RESOURCE_HEADER)
+        f.write(_format_resource_line(now_str, *result))
 
     return True
 
-if __name__ == "__main__":
-    target = "stAgentSvc.exe"
-    ts = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--process", type=str, default="stAgentSvc.exe")
+    parser.add_argument("--pid", type=int, default=0,
+                        help="Monitor this PID instead of looking up --process")
+    parser.add_argument("--hz", type=float, default=1)
+    parser.add_argument("--backend", choices=["auto"] + list(BACKENDS), default="auto")
+    parser.add_argument("--dir", type=str, default="")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    set_resource_backend(args.backend)
+    log_dir = args.dir or os.path.join("log", datetime.now().strftime('%Y%m%d-%H%M%S'))
+    name = args.process if not args.pid else f"pid{args.pid}"
+
+    stop_event = threading.Event()
+    sampler = ResourceSampler(name, log_dir, args.hz, args.pid)
     try:
-        while True:
-            log_resource_usage(target, ts)
-            time.sleep(4.5)
+        sampler.run(stop_event)
     except KeyboardInterrupt:
-        pass
+        stop_event.set()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import logging
+
+logger = logging.getLogger()
+
+PROFILE_FIELDS = [
+    ("ciphers", "ciphers"),
+    ("macs", "digests"),
+    ("kex", "kex"),
+    ("key_types", "key_types"),
+]
+
+def _as_tuple(value) -> tuple:
+    if isinstance(value, str):
+        return tuple(v.strip() for v in value.split(',') if v.strip())
+    return tuple(value or ())
+
+def profile_name(profile) -> str:
+    if not profile:
+        return "default"
+    return profile.get("name") or "custom"
+
+def apply_ssh_profile(transport, profile) -> bool:
+    if not profile:
+        return True
+
+    opts = transport.get_security_options()
+    applied = True
+    for field, attr in PROFILE_FIELDS:
+        wanted = _as_tuple(profile.get(field))
+        if not wanted:
+            continue
+        try:
+            setattr(opts, attr, wanted)
+        except ValueError:
+            logger.warning(
+                f"SSH profile '{profile_name(profile)}': unsupported {field} {list(wanted)}. "
+                "Using defaults."
+            )
+            applied = False
+    return applied
+
+def describe_transport(transport) -> str:
+    return (
+        f"{transport.local_cipher or '-'}/{transport.local_mac or '-'}/"
+        f"{transport.host_key_type or '-'}"
+    )
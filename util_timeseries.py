@@ -0,0 +1,237 @@
+import os
+import time
+import struct
+import logging
+import threading
+from array import array
+
+logger = logging.getLogger()
+
+FILE_MAGIC = b'RSTS\x01\x00\x00\x00'
+COLUMN = struct.Struct('<15sc')
+BLOCK = struct.Struct('<4sIdd')
+BLOCK_MAGIC = b'BLK1'
+
+RAW_COLUMNS = (
+    ("ts", 'd'), ("cpu", 'f'), ("private", 'Q'), ("handles", 'I'), ("threads", 'I'),
+)
+ROLLUP_COLUMNS = (
+    ("ts", 'd'), ("count", 'I'),
+    ("cpu_avg", 'f'), ("cpu_max", 'f'),
+    ("private_avg", 'Q'), ("private_max", 'Q'),
+    ("handles_avg", 'f'), ("handles_max", 'I'),
+    ("threads_max", 'I'),
+)
+ROLLUPS = (("1s", 1), ("1m", 60), ("1h", 3600))
+
+class SeriesWriter:
+    def __init__(self, path: str, columns):
+        self.path = path
+        self.columns = columns
+        self.buffers = [array(code) for _, code in columns]
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if exists:
+            with open(path, 'r+b') as f:
+                existing = read_header(f)
+                if [c[0] for c in existing] != [c[0] for c in columns]:
+                    raise ValueError(f"{path} has a different column layout")
+                end = _complete_end(f, existing)
+                size = os.fstat(f.fileno()).st_size
+                if end < size:
+                    logger.warning(f"{path}: dropping {size - end} bytes of torn block data.")
+                    f.truncate(end)
+        self.file = open(path, 'ab')
+        if not exists:
+            self.file.write(FILE_MAGIC + struct.pack('<H', len(columns)))
+            for name, code in columns:
+                self.file.write(COLUMN.pack(name.encode('ascii'), code.encode('ascii')))
+            self.file.flush()
+
+    def __len__(self) -> int:
+        return len(self.buffers[0])
+
+    def append(self, row) -> None:
+        for buf, value in zip(self.buffers, row):
+            buf.append(value)
+
+    def flush(self) -> None:
+        count = len(self.buffers[0])
+        if not count:
+            return
+        ts = self.buffers[0]
+        self.file.write(BLOCK.pack(BLOCK_MAGIC, count, ts[0], ts[-1]))
+        for buf in self.buffers:
+            self.file.write(buf.tobytes())
+        self.file.flush()
+        self.buffers = [array(code) for _, code in self.columns]
+
+    def close(self) -> None:
+        self.flush()
+        self.file.close()
+
+class Rollup:
+    def __init__(self, period: int):
+        self.period = period
+        self.bucket = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self.count = 0
+        self.cpu_sum = 0.0
+        self.cpu_max = 0.0
+        self.private_sum = 0
+        self.private_max = 0
+        self.handles_sum = 0
+        self.handles_max = 0
+        self.threads_max = 0
+
+    def add(self, row):
+        ts, cpu, private, handles, threads = row
+        bucket = ts - ts % self.period
+        done = None
+        if self.bucket is not None and bucket != self.bucket:
+            done = self.emit()
+        self.bucket = bucket
+        self.count += 1
+        self.cpu_sum += cpu
+        self.cpu_max = max(self.cpu_max, cpu)
+        self.private_sum += private
+        self.private_max = max(self.private_max, private)
+        self.handles_sum += handles
+        self.handles_max = max(self.handles_max, handles)
+        self.threads_max = max(self.threads_max, threads)
+        return done
+
+    def emit(self):
+        if not self.count:
+            return None
+        row = (
+            self.bucket, self.count,
+            self.cpu_sum / self.count, self.cpu_max,
+            self.private_sum // self.count, self.private_max,
+            self.handles_sum / self.count, self.handles_max,
+            self.threads_max,
+        )
+        self._reset()
+        return row
+
+class TimeSeriesStore:
+    def __init__(self, base_path: str, flush_interval: float = 5, block_size: int = 4096):
+        self.base_path = base_path
+        self.flush_interval = flush_interval
+        self.block_size = block_size
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(base_path) or ".", exist_ok=True)
+        self.raw = SeriesWriter(base_path + ".ts", RAW_COLUMNS)
+        self.rollups = [
+            (Rollup(period), SeriesWriter(f"{base_path}.{label}.ts", ROLLUP_COLUMNS))
+            for label, period in ROLLUPS
+        ]
+        self.last_flush = time.monotonic()
+        self.closed = False
+
+    def append(self, ts: float, cpu: float, private: int, handles: int, threads: int) -> None:
+        row = (ts, cpu, private, handles, threads)
+        with self.lock:
+            if self.closed:
+                return
+            self.raw.append(row)
+            for rollup, writer in self.rollups:
+                done = rollup.add(row)
+                if done:
+                    writer.append(done)
+            if (len(self.raw) >= self.block_size or
+                    time.monotonic() - self.last_flush >= self.flush_interval):
+                self._flush()
+
+    def _flush(self) -> None:
+        try:
+            self.raw.flush()
+            for _, writer in self.rollups:
+                writer.flush()
+        except OSError as e:
+            logger.error(f"Failed to write time series {self.base_path}: {e}")
+        self.last_flush = time.monotonic()
+
+    def flush(self) -> None:
+        with self.lock:
+            self._flush()
+
+    def close(self) -> None:
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            for rollup, writer in self.rollups:
+                done = rollup.emit()
+                if done:
+                    writer.append(done)
+            self._flush()
+            self.raw.file.close()
+            for _, writer in self.rollups:
+                writer.file.close()
+
+def read_header(f) -> list[tuple[str, str]]:
+    head = f.read(len(FILE_MAGIC) + 2)
+    if len(head) < len(FILE_MAGIC) + 2 or head[:len(FILE_MAGIC)] != FILE_MAGIC:
+        raise ValueError("not a time series file")
+    (ncols,) = struct.unpack('<H', head[len(FILE_MAGIC):])
+    columns = []
+    for _ in range(ncols):
+        name, code = COLUMN.unpack(f.read(COLUMN.size))
+        columns.append((name.rstrip(b'\0').decode('ascii'), code.decode('ascii')))
+    return columns
+
+def _complete_end(f, columns) -> int:
+    row_size = sum(array(code).itemsize for _, code in columns)
+    size = os.fstat(f.fileno()).st_size
+    end = f.tell()
+    while True:
+        head = f.read(BLOCK.size)
+        if len(head) < BLOCK.size:
+            return end
+        magic, count, _, _ = BLOCK.unpack(head)
+        block_end = end + BLOCK.size + count * row_size
+        if magic != BLOCK_MAGIC or block_end > size:
+            return end
+        f.seek(block_end)
+        end = block_end
+
+def iter_blocks(path: str, start: float | None = None, end: float | None = None):
+    with open(path, 'rb') as f:
+        columns = read_header(f)
+        sizes = [array(code).itemsize for _, code in columns]
+        while True:
+            head = f.read(BLOCK.size)
+            if len(head) < BLOCK.size:
+                return
+            magic, count, first, last = BLOCK.unpack(head)
+            if magic != BLOCK_MAGIC:
+                logger.warning(f"{path}: corrupt block at {f.tell() - BLOCK.size}, stopping.")
+                return
+            block_bytes = count * sum(sizes)
+            if (start is not None and last < start) or (end is not None and first > end):
+                f.seek(block_bytes, os.SEEK_CUR)
+                continue
+            data = f.read(block_bytes)
+            if len(data) < block_bytes:
+                return
+            block = []
+            pos = 0
+            for (_, code), size in zip(columns, sizes):
+                col = array(code)
+                col.frombytes(data[pos:pos + count * size])
+                block.append(col)
+                pos += count * size
+            yield columns, block
+
+def read_rows(path: str, start: float | None = None, end: float | None = None):
+    for _, block in iter_blocks(path, start, end):
+        for row in zip(*block):
+            ts = row[0]
+            if (start is None or ts >= start) and (end is None or ts <= end):
+                yield row
+
+def read_columns(path: str) -> list[tuple[str, str]]:
+    with open(path, 'rb') as f:
+        return read_header(f)
@@ -1,6 +1,7 @@
 import json
 import sys
 import logging
+from util_url_store import BatchComposer
 
 logger = logging.getLogger()
 
@@ -38,6 +39,16 @@ class ToolConfig:
                 "log_validation_ratio": "curl_flood_log_validation_ratio"
             }
         },
+        {
+            "json_key": "http_download",
+            "enable_attr": "http_download_enabled",
+            "fields": {
+                "count": "http_download_count",
+                "duration_sec": "http_download_duration",
+                "concurrent_conn": "http_download_concurrent",
+                "target_urls": "http_download_target_urls"
+            }
+        },
         {
             "json_key": "ftp",
             "enable_attr": "ftp_enabled",
@@ -77,7 +88,8 @@ class ToolConfig:
                 "target_port": "sftp_target_port",
                 "user": "sftp_user",
                 "password": "sftp_password",
-                "file_size_mb": "sftp_file_size_mb"
+                "file_size_mb": "sftp_file_size_mb",
+                "ssh_profiles": "sftp_ssh_profiles"
             }
         }
     ]
@@ -93,7 +105,24 @@ class ToolConfig:
         ("aoac_s4_hibernate_duration", 10, 120, 10),
         ("long_idle_time_min", 300, 7200, 300),
         ("long_idle_time_max", 300, 7200, 300),
-        ("dns_count", 10, 10000, 50)
+        ("dns_count", 10, 10000, 50),
+        ("url_liveness_ttl", 60, 604800, 21600),
+        ("url_liveness_dead_ttl", 60, 604800, 3600),
+        ("url_liveness_concurrent", 1, 100, 20),
+        ("url_health_quarantine_sec", 60, 86400, 1800),
+        ("url_batch_max_hosts", 0, 10000, 0),
+        ("url_batch_max_per_host", 0, 10000, 0),
+        ("url_batch_zipf_s", 0.5, 3.0, 1.1),
+        ("nslog_metrics_flush_sec", 1, 3600, 10),
+        ("flow_validation_budget_sec", 1, 300, 15),
+        ("flow_validation_max_samples", 1, 1000, 100),
+        ("resource_sampler_hz", 0.1, 10, 1),
+        ("leak_window_min", 10, 1440, 60),
+        ("leak_private_mb_per_hour", 1, 10000, 50),
+        ("leak_handles_per_hour", 10, 100000, 1000),
+        ("leak_iter_window", 5, 1000, 20),
+        ("leak_private_mb_per_iter", 0.1, 1000, 5),
+        ("leak_handles_per_iter", 1, 10000, 50)
     ]
 
     # Traffic Validation: (Name, DurationAttr, CountAttr, ConcurrencyAttr, EnabledAttr)
@@ -105,6 +134,8 @@ class ToolConfig:
         ("HTTPS", "curl_flood_duration", "curl_flood_count",
          "curl_flood_concurrent", "curl_flood_enabled"),
         ("AB", "ab_duration", "ab_total_conn", "ab_concurrent", None),
+        ("HTTP_DL", "http_download_duration", "http_download_count",
+         "http_download_concurrent", "http_download_enabled"),
         ("FTP", "ftp_duration", "ftp_count", "ftp_concurrent", "ftp_enabled"),
         ("FTPS", "ftps_duration", "ftps_count", "ftps_concurrent", "ftps_enabled"),
         ("SFTP", "sftp_duration", "sftp_count", "sftp_concurrent", "sftp_enabled")
@@ -168,6 +199,12 @@ class ToolConfig:
         self.curl_flood_log_validation = 0
         self.curl_flood_log_validation_ratio = 5
 
+        self.http_download_enabled = False
+        self.http_download_count = 10
+        self.http_download_duration = 0
+        self.http_download_concurrent = 5
+        self.http_download_target_urls = []
+
         self.ftp_enabled = False
         self.ftp_target_ip = "127.0.0.1"
         self.ftp_target_port = 21
@@ -197,6 +234,41 @@ class ToolConfig:
         self.sftp_duration = 10
         self.sftp_count = 0
         self.sftp_concurrent = 1
+        self.sftp_ssh_profiles = []
+
+        self.url_liveness_enabled = False
+        self.url_liveness_file = "data\\url_liveness.json"
+        self.url_liveness_ttl = 21600
+        self.url_liveness_dead_ttl = 3600
+        self.url_liveness_concurrent = 20
+
+        self.url_health_enabled = False
+        self.url_health_quarantine_sec = 1800
+
+        self.url_batch_policy = "uniform"
+        self.url_batch_max_hosts = 0
+        self.url_batch_max_per_host = 0
+        self.url_batch_zipf_s = 1.1
+
+        self.nslog_metrics_enabled = False
+        self.nslog_metrics_flush_sec = 10
+
+        self.flow_validation_enabled = False
+        self.flow_validation_budget_sec = 15
+        self.flow_validation_max_samples = 100
+
+        self.resource_sampler_enabled = True
+        self.resource_sampler_hz = 1
+        self.resource_sampler_backend = "auto"
+
+        self.leak_detection_enabled = False
+        self.leak_window_min = 60
+        self.leak_private_mb_per_hour = 50
+        self.leak_handles_per_hour = 1000
+        self.leak_iter_window = 20
+        self.leak_private_mb_per_iter = 5
+        self.leak_handles_per_iter = 50
+        self.leak_stop_on_detect = False
 
     def load(self):
         try:
@@ -248,6 +320,59 @@ class ToolConfig:
             self.browser_max_memory = browser.get('max_memory', self.browser_max_memory)
             self.browser_max_tabs = browser.get('max_tabs', self.browser_max_tabs)
 
+            liveness = config.get('url_liveness', {})
+            self.url_liveness_enabled = bool(liveness.get('enable', self.url_liveness_enabled))
+            self.url_liveness_file = liveness.get('file', self.url_liveness_file)
+            self.url_liveness_ttl = liveness.get('ttl_sec', self.url_liveness_ttl)
+            self.url_liveness_dead_ttl = liveness.get('dead_ttl_sec', self.url_liveness_dead_ttl)
+            self.url_liveness_concurrent = liveness.get(
+                'concurrent_conn', self.url_liveness_concurrent
+            )
+
+            health = config.get('url_health', {})
+            self.url_health_enabled = bool(health.get('enable', self.url_health_enabled))
+            self.url_health_quarantine_sec = health.get(
+                'quarantine_sec', self.url_health_quarantine_sec
+            )
+
+            batch = config.get('url_batch', {})
+            self.url_batch_policy = batch.get('policy', self.url_batch_policy)
+            self.url_batch_max_hosts = batch.get('max_hosts', self.url_batch_max_hosts)
+            self.url_batch_max_per_host = batch.get('max_per_host', self.url_batch_max_per_host)
+            self.url_batch_zipf_s = batch.get('zipf_s', self.url_batch_zipf_s)
+
+            metrics = config.get('nslog_metrics', {})
+            self.nslog_metrics_enabled = bool(metrics.get('enable', self.nslog_metrics_enabled))
+            self.nslog_metrics_flush_sec = metrics.get('flush_sec', self.nslog_metrics_flush_sec)
+
+            fv = config.get('flow_validation', {})
+            self.flow_validation_enabled = bool(fv.get('enable', self.flow_validation_enabled))
+            self.flow_validation_budget_sec = fv.get('budget_sec', self.flow_validation_budget_sec)
+            self.flow_validation_max_samples = fv.get(
+                'max_samples', self.flow_validation_max_samples
+            )
+
+            sampler = config.get('resource_sampler', {})
+            self.resource_sampler_enabled = bool(
+                sampler.get('enable', self.resource_sampler_enabled)
+            )
+            self.resource_sampler_hz = sampler.get('hz', self.resource_sampler_hz)
+            self.resource_sampler_backend = sampler.get('backend', self.resource_sampler_backend)
+
+            leak = config.get('leak_detection', {})
+            self.leak_detection_enabled = bool(leak.get('enable', self.leak_detection_enabled))
+            self.leak_window_min = leak.get('window_min', self.leak_window_min)
+            self.leak_private_mb_per_hour = leak.get(
+                'private_mb_per_hour', self.leak_private_mb_per_hour
+            )
+            self.leak_handles_per_hour = leak.get('handles_per_hour', self.leak_handles_per_hour)
+            self.leak_iter_window = leak.get('iter_window', self.leak_iter_window)
+            self.leak_private_mb_per_iter = leak.get(
+                'private_mb_per_iter', self.leak_private_mb_per_iter
+            )
+            self.leak_handles_per_iter = leak.get('handles_per_iter', self.leak_handles_per_iter)
+            self.leak_stop_on_detect = bool(leak.get('stop_on_detect', self.leak_stop_on_detect))
+
             for proto in self.TRAFFIC_MAP:
                 section = tg.get(proto['json_key'], {})
                 current_enabled = getattr(self, proto['enable_attr'])
@@ -274,6 +399,16 @@ class ToolConfig:
                 else:
                     self.ab_target_urls = ["https://google.com"]
 
+            if not isinstance(self.sftp_ssh_profiles, list):
+                logger.warning("'sftp.ssh_profiles' must be a list. Using defaults.")
+                self.sftp_ssh_profiles = []
+
+            if not isinstance(self.http_download_target_urls, list):
+                if self.http_download_target_urls:
+                    self.http_download_target_urls = [self.http_download_target_urls]
+                else:
+                    self.http_download_target_urls = []
+
         except Exception as e:
             logger.error(f"Error loading config: {e}. Exiting.")
             sys.exit(1)
@@ -306,6 +441,10 @@ class ToolConfig:
                 logger.warning(f"Invalid '{attr}' ({val}). Reset to {default}.")
                 setattr(self, attr, default)
 
+        if self.url_batch_policy not in BatchComposer.POLICIES:
+            logger.warning(f"Invalid 'url_batch.policy' ({self.url_batch_policy}). Reset to uniform.")
+            self.url_batch_policy = "uniform"
+
         if self.client_enable_max < self.client_enable_min:
             logger.warning("client_enable_max < min, adjusting to min.")
             self.client_enable_max = self.client_enable_min
@@ -365,7 +504,7 @@ class ToolConfig:
     def _cap_concurrency(self, concurrency, name):
         new_concurrency = concurrency
 
-        if name in ["FTP", "FTPS", "SFTP"]:
+        if name in ["FTP", "FTPS", "SFTP", "HTTP_DL"]:
             if new_concurrency < 1:
                 logger.warning(f"{name} concurrency {new_concurrency} < 1. Resetting to 1.")
                 new_concurrency = 1
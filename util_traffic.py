@@ -16,6 +16,8 @@ import itertools
 from util_subprocess import run_batch, run_curl
 from util_resources import get_system_memory_usage, log_resource_usage
 from util_time import smart_sleep
+from util_ssh import apply_ssh_profile, describe_transport, profile_name
+from util_url_index import UrlIndex
 
 logger = logging.getLogger()
 
@@ -59,15 +61,8 @@ def check_urls_and_write_status(urls) -> None:
     if not urls:
         return
 
-    existing_urls = set()
     target_check_file = r'data\url.txt'
-
-    if os.path.exists(target_check_file):
-        try:
-            with open(target_check_file, 'r', encoding='utf-8') as f:
-                existing_urls = {line.strip() for line in f if line.strip()}
-        except FileNotFoundError:
-            pass
+    existing_urls = UrlIndex.for_corpus(target_check_file)
 
     out_file = r'data\url_alive.txt'
     flush_interval = 50
@@ -100,6 +95,7 @@ def check_urls_and_write_status(urls) -> None:
                 if (index + 1) % flush_interval == 0:
                     f.flush()
 
+    existing_urls.close()
     logger.info(f"Complete. Wrote {alive_count} ALIVE URLs to '{out_file}'.")
 
 def _dns_worker(domain) -> None:
@@ -168,7 +164,7 @@ def generate_dns_flood(
                     pct = int((completed / count) * 100)
                     logger.info(f"DNS Flood progress: {pct}%")
 
-def _udp_worker(target, port, duration, count, stop_event, family) -> None:
+def _udp_worker(target, port, duration, count, stop_event, family, flows=None) -> None:
     sock = socket.socket(family, socket.SOCK_DGRAM)
     payload = os.urandom(1024)
 
@@ -194,6 +190,8 @@ def _udp_worker(target, port, duration, count, stop_event, family) -> None:
             try:
                 sock.sendto(payload, (target, port))
                 sent += 1
+                if sent == 1 and flows is not None:
+                    flows.append((sock.getsockname()[1], target, port))
             except Exception:
                 pass
     except Exception:
@@ -209,7 +207,7 @@ def generate_udp_flood(
     concurrency: int = 1,
     stop_event: threading.Event = None,
     ipv6: bool = False
-) -> None:
+) -> list[tuple]:
     msg = f"UDP flood -> {target}:{port}"
     if duration > 0:
         msg += f" for {duration}s"
@@ -221,12 +219,13 @@ def generate_udp_flood(
     family = socket.AF_INET6 if ipv6 else socket.AF_INET
 
     threads = []
+    flows = []
     count_per_thread = count // concurrency if count > 0 else 0
 
     for i in range(concurrency):
         t = threading.Thread(
             target=_udp_worker,
-            args=(target, port, duration, count_per_thread, stop_event, family)
+            args=(target, port, duration, count_per_thread, stop_event, family, flows)
         )
         t.start()
         threads.append(t)
@@ -235,6 +234,7 @@ def generate_udp_flood(
         t.join()
 
     logger.info("UDP Flood finished.")
+    return flows
 
 def run_high_concurrency_test(
     target_url: str,
@@ -425,22 +425,26 @@ def curl_requests(urls, stop_event=None) -> None:
         run_curl(url)
         logger.info(f"CURL with URL: {url}")
 
-def _curl_flood_worker(url) -> str:
+def _curl_flood_worker(url) -> tuple[str, bool, float]:
+    start = time.time()
     try:
-        cmd = ["curl", "-s", "--max-time", "15", "-o", "NUL", url]
-        subprocess.run(
-            cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        cmd = ["curl", "-s", "--max-time", "15", "-o", "NUL", "-w", "%{http_code}", url]
+        result = subprocess.run(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, encoding='utf-8', errors='replace'
         )
+        ok = result.returncode == 0 and result.stdout.strip() not in ("", "000")
     except Exception:
-        pass
-    return url
+        ok = False
+    return url, ok, (time.time() - start) * 1000
 
 def generate_curl_flood(
     urls,
     count,
     duration=0,
     concurrency=50,
-    stop_event=None
+    stop_event=None,
+    health=None
 ) -> list[str]:
     all_used_urls = []
     if not urls:
@@ -466,7 +470,9 @@ def generate_curl_flood(
             while time.time() < end_time:
                 if _is_stopped(stop_event): break
                 url = next(cycler)
-                _curl_flood_worker(url)
+                used_url, ok, latency_ms = _curl_flood_worker(url)
+                if health:
+                    health.record(used_url, ok, latency_ms)
 
         with concurrent.futures.ThreadPoolExecutor(
             max_workers=concurrency
@@ -509,7 +515,9 @@ def generate_curl_flood(
                     exe.shutdown(wait=False, cancel_futures=True)
                     break
 
-                used_url = f.result()
+                used_url, ok, latency_ms = f.result()
+                if health:
+                    health.record(used_url, ok, latency_ms)
                 all_used_urls.append(used_url)
                 log_buffer.append(used_url)
 
@@ -526,8 +534,98 @@ def generate_curl_flood(
             logger.info("CURL Batch:\n" + "\n".join([f"  -> {u}" for u in log_buffer]))
 
     logger.info("CURL Flood finished.")
+    if health:
+        logger.info(health.summary())
     return all_used_urls
 
+def _curl_download_worker(url) -> tuple[int, float]:
+    try:
+        cmd = [
+            "curl", "-s", "--max-time", "300", "-o", os.devnull,
+            "-w", "%{size_download} %{time_total}", url
+        ]
+        result = subprocess.run(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, encoding='utf-8', errors='replace'
+        )
+        size_str, time_str = result.stdout.split()
+        return int(float(size_str)), float(time_str)
+    except Exception:
+        return 0, 0.0
+
+def generate_http_download_flood(
+    urls,
+    count,
+    duration=0,
+    concurrency=5,
+    stop_event=None
+) -> float:
+    if not urls:
+        logger.warning("No URLs for HTTP download flood.")
+        return 0.0
+
+    msg = f"Start HTTP Download Flood: {concurrency} workers"
+    if duration > 0:
+        msg += f", duration {duration}s"
+    else:
+        msg += f", {count} downloads"
+    logger.info(msg)
+
+    stats_lock = threading.Lock()
+    stats = {"bytes": 0, "done": 0, "failed": 0}
+
+    def _record(size):
+        with stats_lock:
+            if size > 0:
+                stats["bytes"] += size
+                stats["done"] += 1
+            else:
+                stats["failed"] += 1
+
+    start_time = time.time()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as exe:
+        if duration > 0:
+            end_time = start_time + duration
+
+            def _time_worker():
+                cycler = itertools.cycle(urls)
+                while time.time() < end_time:
+                    if _is_stopped(stop_event): break
+                    size, _ = _curl_download_worker(next(cycler))
+                    _record(size)
+
+            futures = [exe.submit(_time_worker) for _ in range(concurrency)]
+            concurrent.futures.wait(futures)
+        else:
+            url_iter = itertools.cycle(urls)
+            futures = []
+            for _ in range(count):
+                if _is_stopped(stop_event): break
+                futures.append(exe.submit(_curl_download_worker, next(url_iter)))
+
+            milestone = max(1, int(count * 0.2))
+            completed = 0
+            for f in concurrent.futures.as_completed(futures):
+                if _is_stopped(stop_event):
+                    exe.shutdown(wait=False, cancel_futures=True)
+                    break
+                size, _ = f.result()
+                _record(size)
+                completed += 1
+                if completed % milestone == 0:
+                    pct = int((completed / count) * 100)
+                    logger.info(f"HTTP Download progress: {pct}%")
+
+    elapsed = max(time.time() - start_time, 0.001)
+    total_mb = stats["bytes"] / (1024 * 1024)
+    mbps = total_mb / elapsed
+    logger.info(
+        f"HTTP Download finished. OK: {stats['done']}, Failed: {stats['failed']}, "
+        f"{total_mb:.1f}MB in {elapsed:.1f}s ({mbps:.2f} MB/s)"
+    )
+    return mbps
+
 class VirtualFile(io.BytesIO):
     def __init__(self, size):
         self._size = size
@@ -558,7 +656,7 @@ class VirtualFile(io.BytesIO):
     def tell(self):
         return self._pos
 
-def _ftp_worker(target, port, user, password, file_size_mb, is_ftps) -> bool:
+def _ftp_worker(target, port, user, password, file_size_mb, is_ftps, flows=None) -> bool:
     ftp = None
     try:
         if is_ftps:
@@ -567,6 +665,8 @@ def _ftp_worker(target, port, user, password, file_size_mb, is_ftps) -> bool:
             ftp = ftplib.FTP()
 
         ftp.connect(target, port, timeout=10)
+        if flows is not None:
+            flows.append((ftp.sock.getsockname()[1], target, port))
         ftp.login(user, password)
 
         if is_ftps:
@@ -599,7 +699,7 @@ def _ftp_worker(target, port, user, password, file_size_mb, is_ftps) -> bool:
 def generate_ftp_traffic(
     target, port, user, password, file_size_mb,
     count, duration, concurrency, stop_event, is_ftps=False
-) -> None:
+) -> list[tuple]:
     protocol = "FTPS" if is_ftps else "FTP"
     msg = f"{protocol} Traffic: {target}:{port}, Size: {file_size_mb}MB"
     if duration > 0:
@@ -611,13 +711,14 @@ def generate_ftp_traffic(
     start_time = time.time()
     end_time = start_time + duration if duration > 0 else 0
     completed = 0
+    flows = []
 
     with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as exe:
         futures = []
 
         def _worker_wrapper():
             return _ftp_worker(
-                target, port, user, password, file_size_mb, is_ftps
+                target, port, user, password, file_size_mb, is_ftps, flows
             )
 
         if duration > 0:
@@ -642,22 +743,32 @@ def generate_ftp_traffic(
                     completed += 1
 
     logger.info(f"{protocol} finished. Completed uploads: {completed}")
+    return flows
 
 def generate_ftps_traffic(
     target, port, user, password, file_size_mb,
     count, duration, concurrency, stop_event
-) -> None:
-    generate_ftp_traffic(
+) -> list[tuple]:
+    return generate_ftp_traffic(
         target, port, user, password, file_size_mb,
         count, duration, concurrency, stop_event, is_ftps=True
     )
 
-def _sftp_worker(target, port, user, password, file_size_mb) -> bool:
+def _sftp_worker(
+    target, port, user, password, file_size_mb, ssh_profile=None, flows=None
+) -> tuple[bool, float, int, str]:
     transport = None
     sftp = None
     try:
         transport = paramiko.Transport((target, port))
-        transport.connect(username=user, password=password)
+        if flows is not None:
+            flows.append((transport.sock.getsockname()[1], target, port))
+        apply_ssh_profile(transport, ssh_profile)
+
+        hs_start = time.time()
+        transport.start_client(timeout=10)
+        transport.auth_password(user, password)
+        handshake = time.time() - hs_start
         sftp = paramiko.SFTPClient.from_transport(transport)
 
         filename = f"upload_{random.randint(1000, 9999)}.bin"
@@ -673,27 +784,45 @@ def _sftp_worker(target, port, user, password, file_size_mb) -> bool:
         except Exception:
             pass
 
-        return True
+        return True, handshake, size_bytes, describe_transport(transport)
     except Exception:
-        return False
+        return False, 0.0, 0, ""
     finally:
         if sftp: sftp.close()
         if transport: transport.close()
 
 def generate_sftp_traffic(
     target, port, user, password, file_size_mb,
-    count, duration, concurrency, stop_event
-) -> None:
+    count, duration, concurrency, stop_event, ssh_profile=None
+) -> list[tuple]:
     msg = f"SFTP Traffic: {target}:{port}, Size: {file_size_mb}MB"
     if duration > 0:
         msg += f", duration {duration}s"
     else:
         msg += f", count {count}"
+    msg += f", SSH profile: {profile_name(ssh_profile)}"
     logger.info(msg)
 
     start_time = time.time()
     end_time = start_time + duration if duration > 0 else 0
-    completed = 0
+    stats_lock = threading.Lock()
+    stats = {"done": 0, "handshake": 0.0, "bytes": 0, "negotiated": set()}
+    flows = []
+
+    def _record(result):
+        ok, handshake, size, negotiated = result
+        if not ok:
+            return
+        with stats_lock:
+            stats["done"] += 1
+            stats["handshake"] += handshake
+            stats["bytes"] += size
+            stats["negotiated"].add(negotiated)
+
+    def _worker():
+        return _sftp_worker(
+            target, port, user, password, file_size_mb, ssh_profile, flows
+        )
 
     with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as exe:
         futures = []
@@ -702,7 +831,7 @@ def generate_sftp_traffic(
             def _time_worker():
                 while time.time() < end_time:
                     if _is_stopped(stop_event): break
-                    _sftp_worker(target, port, user, password, file_size_mb)
+                    _record(_worker())
 
             for _ in range(concurrency):
                 futures.append(exe.submit(_time_worker))
@@ -710,29 +839,22 @@ def generate_sftp_traffic(
         else:
             for _ in range(count):
                 if _is_stopped(stop_event): break
-                futures.append(exe.submit(
-                    _sftp_worker, target, port, user, password, file_size_mb
-                ))
+                futures.append(exe.submit(_worker))
 
             for f in concurrent.futures.as_completed(futures):
                 if _is_stopped(stop_event):
                     exe.shutdown(wait=False, cancel_futures=True)
                     break
-                if f.result():
-                    completed += 1
+                _record(f.result())
 
+    elapsed = max(time.time() - start_time, 0.001)
+    completed = stats["done"]
+    avg_hs_ms = stats["handshake"] / completed * 1000 if completed else 0.0
+    mbps = stats["bytes"] / (1024 * 1024) / elapsed
+    negotiated = ", ".join(sorted(stats["negotiated"])) or "-"
     logger.info(f"SFTP finished. Completed uploads: {completed}")
-
-def get_hostname_from_url(url: str) -> str:
-    try:
-        hostname = url.strip()
-        if hostname.lower().startswith("https://"):
-            hostname = hostname[8:]
-        elif hostname.lower().startswith("http://"):
-            hostname = hostname[7:]
-
-        hostname = hostname.split('/')[0]
-        hostname = hostname.split(':')[0]
-        return hostname
-    except Exception:
-        return ""
+    logger.info(
+        f"SFTP profile '{profile_name(ssh_profile)}': handshake avg {avg_hs_ms:.0f}ms, "
+        f"{mbps:.2f} MB/s, negotiated {negotiated}"
+    )
+    return flows
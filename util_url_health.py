@@ -0,0 +1,261 @@
+import os
+import json
+import time
+import random
+import logging
+import threading
+import concurrent.futures
+from util_time import smart_sleep
+from util_traffic import check_url_alive
+
+logger = logging.getLogger()
+
+STATUS_ALIVE = "alive"
+STATUS_DEAD = "dead"
+
+class LivenessCache:
+    def __init__(self, path: str, ttl: int = 21600, dead_ttl: int = 3600):
+        self.path = path
+        self.ttl = ttl
+        self.dead_ttl = dead_ttl
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.dirty = 0
+
+    def load(self) -> int:
+        if not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            now = time.time()
+            with self.lock:
+                self.entries = {
+                    url: entry for url, entry in data.items()
+                    if isinstance(entry, dict) and entry.get("expires_at", 0) > now
+                }
+            logger.info(f"Loaded {len(self.entries)} liveness entries from {self.path}")
+        except Exception as e:
+            logger.error(f"Failed to load liveness cache {self.path}: {e}")
+        return len(self.entries)
+
+    def save(self) -> None:
+        tmp_path = self.path + ".tmp"
+        with self.lock:
+            if not self.dirty:
+                return
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.entries, f, separators=(',', ':'))
+                os.replace(tmp_path, self.path)
+                self.dirty = 0
+            except OSError as e:
+                logger.error(f"Failed to save liveness cache {self.path}: {e}")
+
+    def get(self, url: str) -> dict | None:
+        entry = self.entries.get(url)
+        if entry and entry["expires_at"] > time.time():
+            return entry
+        return None
+
+    def is_dead(self, url: str) -> bool:
+        entry = self.get(url)
+        return entry is not None and entry["status"] == STATUS_DEAD
+
+    def is_fresh(self, url: str) -> bool:
+        return self.get(url) is not None
+
+    def record(self, url: str, final_url: str, latency_ms: float) -> None:
+        now = time.time()
+        alive = bool(final_url)
+        entry = {
+            "status": STATUS_ALIVE if alive else STATUS_DEAD,
+            "final_url": final_url,
+            "latency_ms": round(latency_ms, 1),
+            "checked_at": int(now),
+            "expires_at": int(now + (self.ttl if alive else self.dead_ttl)),
+        }
+        with self.lock:
+            self.entries[url] = entry
+            self.dirty += 1
+
+    def counts(self) -> tuple[int, int]:
+        now = time.time()
+        alive = dead = 0
+        for entry in list(self.entries.values()):
+            if entry["expires_at"] <= now:
+                continue
+            if entry["status"] == STATUS_ALIVE:
+                alive += 1
+            else:
+                dead += 1
+        return alive, dead
+
+def _probe(url: str) -> tuple[str, float]:
+    start = time.time()
+    final_url = check_url_alive(url)
+    return final_url, (time.time() - start) * 1000
+
+def liveness_checker_loop(
+    cache,
+    urls,
+    concurrency,
+    stop_event,
+    is_paused=None,
+    save_interval=60
+) -> None:
+    logger.info(f"Liveness Checker Thread Started ({concurrency} workers).")
+    batch_size = concurrency * 4
+    cursor = 0
+    last_save = time.time()
+
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=concurrency, thread_name_prefix="liveness"
+    ) as exe:
+        while not stop_event.is_set():
+            if is_paused and is_paused():
+                if smart_sleep(5, stop_event): break
+                continue
+
+            batch = []
+            scanned = 0
+            total = len(urls)
+            while len(batch) < batch_size and scanned < total:
+                if cursor >= total:
+                    cursor = 0
+                url = urls[cursor]
+                cursor += 1
+                scanned += 1
+                if not cache.is_fresh(url):
+                    batch.append(url)
+
+            if not batch:
+                cache.save()
+                if smart_sleep(60, stop_event): break
+                continue
+
+            results = list(exe.map(_probe, batch))
+            if stop_event.is_set():
+                break
+
+            alive = sum(1 for final_url, _ in results if final_url)
+            if alive == 0 and len(batch) >= 10:
+                logger.warning(
+                    f"Liveness Checker: all {len(batch)} probes failed. "
+                    "Network may be down, discarding results."
+                )
+                if smart_sleep(30, stop_event): break
+                continue
+
+            for url, (final_url, latency_ms) in zip(batch, results):
+                cache.record(url, final_url, latency_ms)
+
+            if time.time() - last_save >= save_interval:
+                cache.save()
+                alive_total, dead_total = cache.counts()
+                logger.info(
+                    f"Liveness Checker: {alive_total} alive, {dead_total} dead cached"
+                )
+                last_save = time.time()
+
+    cache.save()
+    logger.info("Liveness Checker Thread Stopped.")
+
+class HealthEntry:
+    __slots__ = ("success", "latency_ms", "samples", "quarantined_until", "strikes")
+
+    def __init__(self, ok: bool, latency_ms: float):
+        self.success = 1.0 if ok else 0.0
+        self.latency_ms = latency_ms
+        self.samples = 0
+        self.quarantined_until = 0.0
+        self.strikes = 0
+
+class UrlHealth:
+    ALPHA = 0.3
+    MIN_SAMPLES = 3
+    QUARANTINE_SCORE = 0.3
+    PREFER_SCORE = 0.7
+    SLOW_MS = 2000.0
+
+    def __init__(self, quarantine_sec: int = 1800, max_quarantine_sec: int = 21600, seed=None):
+        self.quarantine_sec = quarantine_sec
+        self.max_quarantine_sec = max_quarantine_sec
+        self.lock = threading.Lock()
+        self.rng = random.Random(seed)
+        self.entries = {}
+
+    def record(self, url: str, ok: bool, latency_ms: float) -> None:
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(url)
+            if entry is None:
+                entry = HealthEntry(ok, latency_ms)
+                self.entries[url] = entry
+            else:
+                entry.success += self.ALPHA * ((1.0 if ok else 0.0) - entry.success)
+                entry.latency_ms += self.ALPHA * (latency_ms - entry.latency_ms)
+            entry.samples += 1
+
+            if entry.quarantined_until and now >= entry.quarantined_until:
+                entry.quarantined_until = 0.0
+                if ok:
+                    entry.success = max(entry.success, self.PREFER_SCORE)
+                    entry.latency_ms = latency_ms
+                    entry.strikes = 0
+                    return
+
+            if entry.quarantined_until or entry.samples < self.MIN_SAMPLES:
+                return
+            if self._score(entry) >= self.QUARANTINE_SCORE:
+                return
+
+            entry.strikes += 1
+            hold = min(self.quarantine_sec * 2 ** (entry.strikes - 1), self.max_quarantine_sec)
+            entry.quarantined_until = now + hold
+        logger.info(
+            f"URL health: quarantined {url} for {hold}s "
+            f"(success {entry.success:.2f}, latency {entry.latency_ms:.0f}ms)"
+        )
+
+    def _score(self, entry) -> float:
+        penalty = 1.0
+        if entry.latency_ms > self.SLOW_MS:
+            penalty = max(0.2, self.SLOW_MS / entry.latency_ms)
+        return entry.success * penalty
+
+    def score(self, url: str) -> float:
+        entry = self.entries.get(url)
+        if entry is None:
+            return 1.0
+        return self._score(entry)
+
+    def should_skip(self, url: str) -> bool:
+        entry = self.entries.get(url)
+        if entry is None:
+            return False
+        if entry.quarantined_until:
+            return time.time() < entry.quarantined_until
+        score = self._score(entry)
+        if score >= self.PREFER_SCORE:
+            return False
+        return self.rng.random() > score
+
+    def summary(self) -> str:
+        now = time.time()
+        with self.lock:
+            entries = list(self.entries.values())
+        if not entries:
+            return "URL health: no samples yet"
+
+        quarantined = sum(1 for e in entries if e.quarantined_until > now)
+        weak = sum(
+            1 for e in entries
+            if e.quarantined_until <= now and self._score(e) < self.PREFER_SCORE
+        )
+        avg_success = sum(e.success for e in entries) / len(entries)
+        avg_latency = sum(e.latency_ms for e in entries) / len(entries)
+        return (
+            f"URL health: {len(entries)} tracked, {quarantined} quarantined, {weak} weak | "
+            f"avg success {avg_success:.2f}, avg latency {avg_latency:.0f}ms"
+        )
@@ -0,0 +1,178 @@
+import os
+import mmap
+import heapq
+import bisect
+import struct
+import hashlib
+import logging
+from array import array
+
+logger = logging.getLogger()
+
+INDEX_MAGIC = b'URLIDX1\0'
+HEADER = struct.Struct('<8sQ')
+SORT_CHUNK = 1 << 20
+
+def normalize_url(url: str) -> str:
+    return url.strip().rstrip('/')
+
+def url_hash(url: str) -> int:
+    digest = hashlib.blake2b(normalize_url(url).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+def _unique(values):
+    last = None
+    for value in values:
+        if value != last:
+            yield value
+            last = value
+
+class UrlIndex:
+    def __init__(self, path: str):
+        self.path = path
+        self.file = None
+        self.map = None
+        self.hashes = ()
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def __contains__(self, url: str) -> bool:
+        return self.contains_hash(url_hash(url))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def contains_hash(self, value: int) -> bool:
+        pos = bisect.bisect_left(self.hashes, value)
+        return pos < len(self.hashes) and self.hashes[pos] == value
+
+    def open(self) -> bool:
+        self.close()
+        if not os.path.exists(self.path):
+            return False
+        try:
+            self.file = open(self.path, 'rb')
+            magic, count = HEADER.unpack(self.file.read(HEADER.size))
+            if magic != INDEX_MAGIC:
+                logger.error(f"{self.path} is not a URL index. Rebuild required.")
+                self.close()
+                return False
+            if count:
+                self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+                view = memoryview(self.map)[HEADER.size:HEADER.size + count * 8]
+                self.hashes = view.cast('Q')
+            return True
+        except (OSError, struct.error, ValueError) as e:
+            logger.error(f"Failed to open URL index {self.path}: {e}")
+            self.close()
+            return False
+
+    def close(self) -> None:
+        if isinstance(self.hashes, memoryview):
+            self.hashes.release()
+        self.hashes = ()
+        if self.map:
+            self.map.close()
+            self.map = None
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def _write(self, values) -> int:
+        tmp_path = self.path + ".tmp"
+        count = 0
+        buf = array('Q')
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(INDEX_MAGIC, 0))
+            for value in values:
+                buf.append(value)
+                if len(buf) >= 65536:
+                    buf.tofile(f)
+                    count += len(buf)
+                    buf = array('Q')
+            buf.tofile(f)
+            count += len(buf)
+            f.seek(0)
+            f.write(HEADER.pack(INDEX_MAGIC, count))
+
+        self.close()
+        os.replace(tmp_path, self.path)
+        self.open()
+        return count
+
+    def build(self, url_file: str) -> int:
+        runs = []
+        chunk = []
+        with open(url_file, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                chunk.append(url_hash(line))
+                if len(chunk) >= SORT_CHUNK:
+                    runs.append(array('Q', sorted(chunk)))
+                    chunk = []
+        if chunk:
+            runs.append(array('Q', sorted(chunk)))
+        del chunk
+
+        count = self._write(_unique(heapq.merge(*runs)))
+        logger.info(f"Built URL index {self.path} with {count} entries from {url_file}")
+        return count
+
+    def add_many(self, urls) -> list[str]:
+        new_urls = []
+        new_hashes = set()
+        for url in urls:
+            url = normalize_url(url)
+            if not url:
+                continue
+            value = url_hash(url)
+            if value in new_hashes or self.contains_hash(value):
+                continue
+            new_hashes.add(value)
+            new_urls.append(url)
+
+        if new_hashes:
+            self._write(_unique(heapq.merge(self.hashes, sorted(new_hashes))))
+        return new_urls
+
+    @classmethod
+    def for_corpus(cls, url_file: str, index_path: str = "") -> "UrlIndex":
+        index = cls(index_path or os.path.splitext(url_file)[0] + ".idx")
+        stale = (
+            not os.path.exists(index.path) or
+            (os.path.exists(url_file) and
+             os.path.getmtime(index.path) < os.path.getmtime(url_file))
+        )
+        if stale and os.path.exists(url_file):
+            index.build(url_file)
+        elif not index.open() and os.path.exists(url_file):
+            index.build(url_file)
+        return index
+
+def merge_into_corpus(src_file: str, url_file: str, index: UrlIndex) -> int:
+    if not os.path.exists(src_file):
+        logger.warning(f"{src_file} not found. Nothing to merge.")
+        return 0
+
+    with open(src_file, 'r', encoding='utf-8') as f:
+        new_urls = index.add_many(line for line in f if line.strip())
+
+    if new_urls:
+        needs_newline = False
+        if os.path.exists(url_file) and os.path.getsize(url_file):
+            with open(url_file, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b'\n'
+        with open(url_file, 'a', encoding='utf-8') as f:
+            if needs_newline:
+                f.write("\n")
+            for url in new_urls:
+                f.write(url + "\n")
+        os.utime(index.path)
+    logger.info(f"Merged {len(new_urls)} new URLs from {src_file} into {url_file}")
+    return len(new_urls)
@@ -0,0 +1,313 @@
+import random
+import logging
+import functools
+from array import array
+from urllib.parse import urlsplit
+
+logger = logging.getLogger()
+
+DEFAULT_PORTS = {"http": 80, "https": 443, "ftp": 21, "sftp": 22}
+
+class UrlRecord:
+    __slots__ = (
+        "url", "scheme", "host", "port", "path",
+        "exception_version", "in_exception"
+    )
+
+    def __init__(self, url: str):
+        self.url = url
+        text = url.strip()
+        self.scheme = ""
+        self.host = text.split("://")[-1].split('/')[0].split(':')[0].lower()
+        self.port = None
+        self.path = "/"
+        try:
+            parts = urlsplit(text if "://" in text else "//" + text)
+            self.scheme = parts.scheme.lower()
+            self.host = parts.hostname or self.host
+            self.path = parts.path or "/"
+            self.port = parts.port
+        except ValueError:
+            pass
+        if self.port is None:
+            self.port = DEFAULT_PORTS.get(self.scheme)
+
+        self.exception_version = -1
+        self.in_exception = False
+
+@functools.lru_cache(maxsize=131072)
+def url_record(url: str) -> UrlRecord:
+    return UrlRecord(url)
+
+class ShuffledPermutation:
+    ROUNDS = 4
+
+    def __init__(self, size: int, rng: random.Random):
+        self.size = size
+        bits = max(2, (size - 1).bit_length())
+        if bits % 2:
+            bits += 1
+        self.half = bits // 2
+        self.mask = (1 << self.half) - 1
+        self.keys = [rng.getrandbits(32) for _ in range(self.ROUNDS)]
+
+    def _round(self, value: int, key: int) -> int:
+        value = (value * 0x9E3779B1 + key) & 0xFFFFFFFF
+        value ^= value >> 15
+        value = (value * 0x85EBCA6B) & 0xFFFFFFFF
+        value ^= value >> 13
+        return value & self.mask
+
+    def __getitem__(self, index: int) -> int:
+        value = index
+        while True:
+            left, right = value >> self.half, value & self.mask
+            for key in self.keys:
+                left, right = right, left ^ self._round(right, key)
+            value = (left << self.half) | right
+            if value < self.size:
+                return value
+
+class UrlStore:
+    def __init__(self, seed=None):
+        self.data = bytearray()
+        self.offsets = array('Q', [0])
+        self.rng = random.Random(seed)
+        self.perm = None
+        self.cursor = 0
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        count = len(self)
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError("UrlStore index out of range")
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return self.data[start:end].decode('utf-8', errors='replace')
+
+    def load(self, path: str) -> int:
+        data = bytearray()
+        offsets = array('Q', [0])
+        with open(path, 'rb') as f:
+            for raw in f:
+                line = raw.strip().rstrip(b'/')
+                if not line:
+                    continue
+                data += line
+                offsets.append(len(data))
+
+        self.data = data
+        self.offsets = offsets
+        self.reshuffle()
+        return len(self)
+
+    def reshuffle(self) -> None:
+        self.cursor = 0
+        self.perm = ShuffledPermutation(len(self), self.rng) if len(self) else None
+
+    def _draw(self) -> str:
+        if self.cursor >= len(self):
+            self.reshuffle()
+            logger.info("All URLs used. Re-shuffling list.")
+        idx = self.perm[self.cursor]
+        self.cursor += 1
+        return self[idx]
+
+    def next_batch(self, batch_size: int, skip=None) -> list[str]:
+        count = len(self)
+        if count == 0:
+            return []
+
+        if count <= batch_size:
+            batch = [self[self.perm[i]] for i in range(count)]
+            self.reshuffle()
+            if skip:
+                batch = [url for url in batch if not skip(url)] or batch
+            return batch
+
+        if not skip:
+            return [self._draw() for _ in range(batch_size)]
+
+        batch = []
+        skipped = 0
+        while len(batch) < batch_size and skipped < count:
+            url = self._draw()
+            if skip(url):
+                skipped += 1
+                continue
+            batch.append(url)
+        if skipped:
+            logger.info(f"Skipped {skipped} dead or unhealthy URLs.")
+        if not batch:
+            batch = [self._draw() for _ in range(batch_size)]
+        return batch
+
+    def sample(self, k: int, skip=None) -> list[str]:
+        k = min(k, len(self))
+        if not skip:
+            return [self[i] for i in self.rng.sample(range(len(self)), k)]
+
+        picked = []
+        for i in self.rng.sample(range(len(self)), min(len(self), k * 10)):
+            url = self[i]
+            if not skip(url):
+                picked.append(url)
+                if len(picked) == k:
+                    break
+        return picked
+
+    def memory_bytes(self) -> int:
+        return len(self.data) + self.offsets.itemsize * len(self.offsets)
+
+SECOND_LEVEL_LABELS = {"co", "com", "net", "org", "gov", "edu", "ac", "or", "ne", "go"}
+
+def site_key(host: str) -> str:
+    labels = host.split('.')
+    if len(labels) <= 2:
+        return host
+    if len(labels[-1]) == 2 and labels[-2] in SECOND_LEVEL_LABELS:
+        return '.'.join(labels[-3:])
+    return '.'.join(labels[-2:])
+
+class BatchComposer:
+    POLICIES = ("uniform", "spread", "reuse", "zipf")
+
+    def __init__(
+        self, store, policy="uniform", max_hosts=0, max_per_host=0, zipf_s=1.1, seed=None
+    ):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown batch policy '{policy}'")
+        self.store = store
+        self.policy = policy
+        self.max_hosts = max_hosts
+        self.max_per_host = max_per_host
+        self.zipf_s = zipf_s
+        self.rng = random.Random(seed)
+        self.ranking = None
+
+    def compose(self, batch_size: int, skip=None) -> list[str]:
+        if not len(self.store) or batch_size <= 0:
+            return []
+        if self.policy == "spread":
+            batch = self._spread(batch_size, skip)
+        elif self.policy == "reuse":
+            batch = self._reuse(batch_size, skip)
+        elif self.policy == "zipf":
+            batch = self._zipf(batch_size, skip)
+        else:
+            batch = self.store.next_batch(batch_size, skip)
+
+        sites = {site_key(url_record(url).host) for url in batch}
+        logger.info(f"Batch ({self.policy}): {len(batch)} URLs across {len(sites)} sites")
+        return batch
+
+    def _draw_usable(self, skip, budget: int):
+        for _ in range(budget):
+            url = self.store._draw()
+            if skip and skip(url):
+                continue
+            yield url
+
+    def _spread(self, batch_size: int, skip) -> list[str]:
+        per_site = self.max_per_host or 1
+        counts = {}
+        batch = []
+        for url in self._draw_usable(skip, min(len(self.store), batch_size * 20)):
+            site = site_key(url_record(url).host)
+            if counts.get(site, 0) >= per_site:
+                continue
+            if site not in counts and self.max_hosts and len(counts) >= self.max_hosts:
+                continue
+            counts[site] = counts.get(site, 0) + 1
+            batch.append(url)
+            if len(batch) >= batch_size:
+                break
+        return self._fill(batch, batch_size, per_site)
+
+    def _reuse(self, batch_size: int, skip) -> list[str]:
+        if self.max_per_host:
+            per_site = self.max_per_host
+        else:
+            per_site = -(-batch_size // (self.max_hosts or 5))
+        hosts_needed = -(-batch_size // per_site)
+        if self.max_hosts:
+            hosts_needed = min(hosts_needed, self.max_hosts)
+
+        sites = {}
+        total = 0
+        for url in self._draw_usable(skip, min(len(self.store), batch_size * 20)):
+            site = site_key(url_record(url).host)
+            urls = sites.get(site)
+            if urls is None:
+                if len(sites) >= hosts_needed:
+                    continue
+                urls = sites[site] = []
+            if len(urls) >= per_site or url in urls:
+                continue
+            urls.append(url)
+            total += 1
+            if total >= batch_size:
+                break
+
+        batch = [url for urls in sites.values() for url in urls]
+        return self._fill(batch, batch_size, per_site)
+
+    def _zipf_rank(self, size: int) -> int:
+        u = self.rng.random()
+        s = self.zipf_s
+        if abs(s - 1.0) < 1e-9:
+            rank = int(size ** u)
+        else:
+            rank = int(((size ** (1 - s) - 1) * u + 1) ** (1 / (1 - s)))
+        return min(max(rank, 1), size) - 1
+
+    def _zipf(self, batch_size: int, skip) -> list[str]:
+        size = len(self.store)
+        if self.ranking is None or self.ranking.size != size:
+            self.ranking = ShuffledPermutation(size, self.rng)
+
+        counts = {}
+        batch = []
+        for _ in range(batch_size * 20):
+            url = self.store[self.ranking[self._zipf_rank(size)]]
+            if skip and skip(url):
+                continue
+            site = site_key(url_record(url).host)
+            if self.max_per_host and counts.get(site, 0) >= self.max_per_host:
+                continue
+            if site not in counts and self.max_hosts and len(counts) >= self.max_hosts:
+                continue
+            counts[site] = counts.get(site, 0) + 1
+            batch.append(url)
+            if len(batch) >= batch_size:
+                break
+        return self._fill(batch, batch_size, self.max_per_host)
+
+    def _fill(self, batch: list[str], batch_size: int, per_site: int) -> list[str]:
+        if batch and len(batch) < batch_size:
+            sites = {url: site_key(url_record(url).host) for url in batch}
+            counts = {}
+            for url in batch:
+                counts[sites[url]] = counts.get(sites[url], 0) + 1
+            filled = list(batch)
+            added = True
+            while added and len(filled) < batch_size:
+                added = False
+                for url in batch:
+                    if len(filled) >= batch_size:
+                        break
+                    if per_site and counts[sites[url]] >= per_site:
+                        continue
+                    counts[sites[url]] += 1
+                    filled.append(url)
+                    added = True
+            batch = filled
+
+        if len(batch) < batch_size:
+            logger.warning(
+                f"Batch ({self.policy}): only {len(batch)}/{batch_size} URLs fit the site caps"
+            )
+        return batch[:batch_size]
@@ -1,22 +1,31 @@
 import os
 import re
+import mmap
 import logging
 import threading
-import codecs
 import json
+import time
+import math
+import random
+from collections import deque
 from datetime import datetime, timedelta
-from urllib.parse import urlparse
 from util_time import smart_sleep
 import util_cert
+from util_log_index import LogTimeIndex
+from util_log_stats import STATS_MARKERS
+from util_url_store import url_record
 
 logger = logging.getLogger(__name__)
 
+FLOW_MARKERS = (b"Tunneling flow from addr", b"bypassing flow to exception host")
+INDEX_SAVE_INTERVAL = 30
+
 class NsClientLogValidator:
-    def __init__(self):
+    def __init__(self, log_path=None, index_path=None):
         self.prog_data = os.environ.get('ProgramData', 'C:\\ProgramData')
         self.stagent_path = os.path.join(self.prog_data, 'netskope', 'stagent')
 
-        self.log_path = os.path.join(
+        self.log_path = log_path or os.path.join(
             self.stagent_path, 'logs', 'nsdebuglog.log'
         )
 
@@ -25,6 +34,10 @@ class NsClientLogValidator:
         self.last_pos = 0
         self.last_inode = 0
         self.pending_reads = []
+        self.time_index = LogTimeIndex(
+            index_path or os.path.join("data", "nslog_time_index.json")
+        )
+        self.last_index_save = 0.0
 
     def get_steering_config(self):
         json_path = os.path.join(self.stagent_path, 'data', 'nssteering.json')
@@ -45,75 +58,40 @@ class NsClientLogValidator:
                 except OSError:
                     self.last_pos = 0
 
+    def rotated_paths(self):
+        paths = []
+        for i in range(1, 11):
+            p = self.log_path.replace('.log', f'.{i}.log')
+            if not os.path.exists(p):
+                break
+            paths.append(p)
+        return paths
+
     def update_pos_with_time_buffer(self, seconds=100):
         with self.lock:
             self.pending_reads = []
-            target_time = datetime.now() - timedelta(seconds=seconds)
-
-            def scan_file(filepath):
-                if not os.path.exists(filepath):
-                    return None, 0, 0
-                try:
-                    st = os.stat(filepath)
-                    fsize = st.st_size
-                    inode = st.st_ino
-                    if fsize == 0: return None, 0, inode
-
-                    chunk_size = 1024 * 1024
-                    pos = fsize
-
-                    min_pos = max(0, fsize - (50 * 1024 * 1024))
-                    while pos > min_pos:
-                        read_len = min(chunk_size, pos - min_pos)
-                        pos -= read_len
-                        try:
-                            with open(filepath, 'rb') as f:
-                                f.seek(pos)
-                                chunk = f.read(read_len)
-                                text = chunk.decode('utf-8', errors='ignore')
-                                match = re.search(
-                                    r'(\d{4}/\d{2}/\d{2} \d{2}:\d{2}:\d{2})',
-                                    text
-                                )
-                                if match:
-                                    ts_str = match.group(1)
-                                    try:
-                                        ts = datetime.strptime(ts_str, '%Y/%m/%d %H:%M:%S')
-                                        if ts < target_time:
-                                            return True, pos, inode
-                                    except ValueError:
-                                        pass
-                        except Exception:
-                            break
-                    return False, pos, inode
-                except OSError:
-                    return None, 0, 0
+            target_ts = (datetime.now() - timedelta(seconds=seconds)).timestamp()
+            self.time_index.load()
 
-            found, pos, inode = scan_file(self.log_path)
+            found, pos, inode = self.time_index.seek(self.log_path, target_ts)
             if found:
                 self.last_pos = pos
                 self.last_inode = inode
+                self.save_time_index()
                 logger.info(f"Log seek: Found logs older than {seconds}s in current log at {pos}")
                 return
 
-            rotated_files = []
-            for i in range(1, 11):
-                p = self.log_path.replace('.log', f'.{i}.log')
-                if os.path.exists(p):
-                    rotated_files.append(p)
-                else:
-                    break
+            rotated_files = self.rotated_paths()
 
             found_idx = -1
             found_pos = 0
 
             for idx, fpath in enumerate(rotated_files):
-                found, pos, inode = scan_file(fpath)
-                if found is not None:
-                    if found:
-                        found_idx = idx
-                        found_pos = pos
-                        break
+                found, pos, inode = self.time_index.seek(fpath, target_ts)
+                if found:
+                    found_idx = idx
+                    found_pos = pos
+                    break
 
             files_to_queue = []
             if found_idx != -1:
@@ -140,21 +118,81 @@ class NsClientLogValidator:
                 self.last_inode = 0
                 self.last_pos = 0
 
+            self.save_time_index()
             logger.info(
                 f"Log seek: Queued {len(self.pending_reads)} pending files based on inodes."
             )
 
-    def _read_chunk(self, filepath, start_pos):
+    def save_time_index(self):
+        live_inodes = set()
+        for fpath in [self.log_path] + self.rotated_paths():
+            try:
+                live_inodes.add(os.stat(fpath).st_ino)
+            except OSError:
+                pass
+        self.time_index.save(live_inodes)
+        self.last_index_save = time.monotonic()
+
+    def _map_file(self, f, start_pos):
+        size = os.fstat(f.fileno()).st_size
+        if size <= start_pos:
+            return None, 0, 0
+        base = start_pos - start_pos % mmap.ALLOCATIONGRANULARITY
+        mm = mmap.mmap(f.fileno(), size - base, access=mmap.ACCESS_READ, offset=base)
+        return mm, base, size
+
+    def _scan_lines(self, filepath, start_pos, markers, complete=True):
         if not os.path.exists(filepath):
-            return ""
+            return [], start_pos
         try:
-            with codecs.open(filepath, 'r', encoding='utf-8', errors='replace') as f:
-                f.seek(start_pos)
-                content = f.read()
-                return content
-        except Exception as e:
+            with open(filepath, 'rb') as f:
+                mm, base, size = self._map_file(f, start_pos)
+                if mm is None:
+                    return [], start_pos
+                with mm:
+                    lo = start_pos - base
+                    hi = size - base
+                    if not complete:
+                        last_newline = mm.rfind(b'\n', lo, hi)
+                        hi = last_newline + 1 if last_newline != -1 else lo
+
+                    spans = set()
+                    for marker in markers:
+                        pos = mm.find(marker, lo, hi)
+                        while pos != -1:
+                            line_start = max(lo, mm.rfind(b'\n', lo, pos) + 1)
+                            line_end = mm.find(b'\n', pos, hi)
+                            if line_end == -1:
+                                line_end = hi
+                            spans.add((line_start, line_end))
+                            pos = mm.find(marker, line_end, hi)
+
+                    lines = [
+                        mm[a:b].decode('utf-8', errors='replace').rstrip('\r')
+                        for a, b in sorted(spans)
+                    ]
+                    return lines, base + hi
+        except (OSError, ValueError) as e:
             logger.error(f"Failed to read log {filepath}: {e}")
-            return ""
+            return [], start_pos
+
+    def _search_file(self, filepath, start_pos, pattern, flags=0, is_regex=True):
+        if not os.path.exists(filepath):
+            return False
+        try:
+            with open(filepath, 'rb') as f:
+                mm, base, _ = self._map_file(f, start_pos)
+                if mm is None:
+                    return False
+                with mm:
+                    needle = pattern.encode('utf-8')
+                    if is_regex:
+                        regex = re.compile(needle, flags)
+                        return regex.search(mm, start_pos - base) is not None
+                    return mm.find(needle, start_pos - base) != -1
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to read log {filepath}: {e}")
+            return False
 
     def check_log(self, pattern, flags=0, is_regex=True):
         with self.lock:
@@ -167,21 +205,13 @@ class NsClientLogValidator:
                     current_size = 0
 
             if current_size < self.last_pos:
-                content_old = self._read_chunk(self.rotated_log_path, self.last_pos)
-                if is_regex:
-                    if re.search(pattern, content_old, flags=flags):
-                        found = True
-                elif pattern in content_old:
-                    found = True
+                found = self._search_file(
+                    self.rotated_log_path, self.last_pos, pattern, flags, is_regex
+                )
                 self.last_pos = 0
 
-            content_new = self._read_chunk(self.log_path, self.last_pos)
             if not found:
-                if is_regex:
-                    if re.search(pattern, content_new, flags=flags):
-                        found = True
-                elif pattern in content_new:
-                    found = True
+                found = self._search_file(self.log_path, self.last_pos, pattern, flags, is_regex)
 
             if os.path.exists(self.log_path):
                 self.last_pos = os.path.getsize(self.log_path)
@@ -189,9 +219,9 @@ class NsClientLogValidator:
                 self.last_pos = 0
             return found
 
-    def read_new_logs(self):
+    def read_new_lines(self, markers=FLOW_MARKERS):
         with self.lock:
-            content = ""
+            lines = []
 
             def find_file_by_inode(target_inode):
 
@@ -213,8 +243,7 @@ class NsClientLogValidator:
                 for inode, start_pos in self.pending_reads:
                     fpath = find_file_by_inode(inode)
                     if fpath:
-                        chunk = self._read_chunk(fpath, start_pos)
-                        content += chunk
+                        lines += self._scan_lines(fpath, start_pos, markers)[0]
                 self.pending_reads = []
 
             try:
@@ -222,13 +251,14 @@ class NsClientLogValidator:
                 current_inode = st.st_ino
                 current_size = st.st_size
             except OSError:
-                return content
+                return lines
 
-            if self.last_inode != 0 and current_inode != self.last_inode:
+            rotated = self.last_inode != 0 and current_inode != self.last_inode
+            if rotated:
 
                 old_path = find_file_by_inode(self.last_inode)
                 if old_path:
-                    content += self._read_chunk(old_path, self.last_pos)
+                    lines += self._scan_lines(old_path, self.last_pos, markers)[0]
 
                 self.last_pos = 0
                 self.last_inode = current_inode
@@ -237,24 +267,23 @@ class NsClientLogValidator:
 
                 self.last_pos = 0
 
-            chunk = self._read_chunk(self.log_path, self.last_pos)
-            content += chunk
-
-            if os.path.exists(self.log_path):
-                try:
-                    st = os.stat(self.log_path)
-                    self.last_pos = st.st_size
-                    self.last_inode = st.st_ino
-                except OSError:
-                    pass
-
-            if content:
-                preview_start = content[:100].replace('\r', '\\r').replace('\n', '\\n')
-                preview_end = content[-100:].replace('\r', '\\r').replace('\n', '\\n')
-                logger.info(f"Log Reader: Read {len(content)} bytes. Start: '{preview_start}'")
-                logger.info(f"Log Reader: End: '{preview_end}'")
+            start_pos = self.last_pos
+            new_lines, self.last_pos = self._scan_lines(
+                self.log_path, self.last_pos, markers, complete=False
+            )
+            lines += new_lines
+            self.last_inode = current_inode
+            self.time_index.update(self.log_path, LogTimeIndex.STRIDE)
+            if rotated or time.monotonic() - self.last_index_save >= INDEX_SAVE_INTERVAL:
+                self.save_time_index()
+
+            if lines or self.last_pos > start_pos:
+                logger.debug(
+                    f"Log Reader: Scanned {self.last_pos - start_pos} bytes, "
+                    f"{len(lines)} matching lines."
+                )
 
-            return content
+            return lines
 
 _validator = None
 _validator_lock = threading.Lock()
@@ -266,6 +295,12 @@ def get_validator() -> object:
             _validator = NsClientLogValidator()
     return _validator
 
+def init_validator(log_path=None, index_path=None) -> NsClientLogValidator:
+    global _validator
+    with _validator_lock:
+        _validator = NsClientLogValidator(log_path, index_path)
+    return _validator
+
 def get_steering_config() -> dict:
     return get_validator().get_steering_config()
 
@@ -277,38 +312,199 @@ def check_nsclient_log_regex(pattern, flags=0) -> bool:
     validator = get_validator()
     return validator.check_log(pattern, flags=flags, is_regex=True)
 
-def check_tunneling_in_text(process_name, url, text) -> bool:
-    if not url or not text:
-        return False
-    try:
-        parsed = urlparse(url)
-        host = parsed.hostname
-        if not host:
-            if "://" not in url:
-                host = url.split("/")[0].split(":")[0]
-
-        if not host:
-            return True
+TUNNEL_RE = re.compile(r"Tunneling flow from addr: .*, process: (.+?) to host: ([^,:\s]+)[,:]")
+BYPASS_RE = re.compile(r"bypassing flow to exception host: ([^,\s]+), process: ([^,\s]+)")
 
-        pat_tunnel = (
-            r"Tunneling flow from addr: .*, process: " +
-            re.escape(process_name) +
-            r" to host: " + re.escape(host) + r"(,|:)"
-        )
+FLOW_DEST_RE = re.compile(
+    r"Tunneling flow from addr: [^,]*?:(\d+), process: .+? to host: (\S+?):(\d+)(?=[,\s]|$)"
+)
 
-        pat_bypass = (
-            r"bypassing flow to exception host: " +
-            re.escape(host) +
-            r", process: " + re.escape(process_name)
-        )
+def normalize_host(host) -> str | None:
+    return host.strip("[]").lower() if host else None
 
-        if re.search(pat_tunnel, text) or re.search(pat_bypass, text):
-            return True
-        return False
-    except Exception:
-        return False
+def parse_flow_dest(line: str) -> tuple[int, str, int] | None:
+    match = FLOW_DEST_RE.search(line)
+    if match is None:
+        return None
+    return int(match.group(1)), normalize_host(match.group(2)), int(match.group(3))
+
+def parse_flow(line: str) -> tuple[str, str, str] | None:
+    match = TUNNEL_RE.search(line)
+    if match:
+        return match.group(1), match.group(2).lower(), "tunnel"
+    match = BYPASS_RE.search(line)
+    if match:
+        return match.group(2), match.group(1).lower(), "bypass"
+    return None
 
-def validate_traffic_flow(process_map, stop_event, exception_checker=None) -> bool:
+class FlowIndex:
+    def __init__(self):
+        self.flows = {}
+        self.partial = ""
+
+    def add_line(self, line: str) -> bool:
+        flow = parse_flow(line)
+        if flow is None:
+            return False
+        self.flows.setdefault(flow[:2], flow[2])
+        return True
+
+    def feed_lines(self, lines) -> int:
+        added = 0
+        for line in lines:
+            if self.add_line(line):
+                added += 1
+        return added
+
+    def feed(self, text: str) -> int:
+        if not text:
+            return 0
+        lines = (self.partial + text).split('\n')
+        self.partial = lines.pop()
+        added = 0
+        for line in lines:
+            if "flow " in line and self.add_line(line):
+                added += 1
+        return added
+
+    def seen(self, process_name: str, host: str) -> bool:
+        return (process_name, host.lower()) in self.flows
+
+class LogFollower:
+    def __init__(self, validator, stop_event, interval=0.5, capacity=200000, stats=None):
+        self.validator = validator
+        self.stop_event = stop_event
+        self.interval = interval
+        self.stats = stats
+        self.markers = FLOW_MARKERS + STATS_MARKERS if stats else FLOW_MARKERS
+        self.cond = threading.Condition()
+        self.events = deque(maxlen=capacity)
+        self.last_seen = {}
+        self.last_flow = {}
+        self.seq = 0
+        self.thread = None
+
+    def start(self) -> None:
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def is_alive(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def mark(self) -> int:
+        with self.cond:
+            return self.seq
+
+    def _loop(self) -> None:
+        logger.info("Log Follower Thread Started.")
+        while not self.stop_event.is_set():
+            try:
+                lines = self.validator.read_new_lines(self.markers)
+            except Exception as e:
+                logger.error(f"Log Follower: read failed: {e}")
+                lines = []
+
+            flows = []
+            for line in lines:
+                flow = parse_flow(line)
+                if flow:
+                    dest = parse_flow_dest(line) if flow[2] == "tunnel" else None
+                    flows.append((flow, dest))
+                if self.stats:
+                    self.stats.add(line, flow)
+            if self.stats:
+                self.stats.maybe_flush()
+
+            if flows:
+                with self.cond:
+                    for flow, dest in flows:
+                        self.seq += 1
+                        self.events.append((self.seq,) + flow)
+                        self.last_seen[flow[:2]] = self.seq
+                        if dest:
+                            sport, host, port = dest
+                            self.last_flow[dest] = self.seq
+                            self.last_flow[(None, host, port)] = self.seq
+                            self.last_flow[(None, None, port)] = self.seq
+                    if len(self.last_seen) > self.events.maxlen:
+                        oldest = self.events[0][0]
+                        self.last_seen = {
+                            key: seq for key, seq in self.last_seen.items() if seq >= oldest
+                        }
+                    if len(self.last_flow) > self.events.maxlen:
+                        oldest = self.events[0][0]
+                        self.last_flow = {
+                            key: seq for key, seq in self.last_flow.items() if seq >= oldest
+                        }
+                    self.cond.notify_all()
+
+            self.stop_event.wait(self.interval)
+        with self.cond:
+            self.cond.notify_all()
+        if self.stats:
+            self.stats.close()
+        with self.validator.lock:
+            self.validator.save_time_index()
+        logger.info("Log Follower Thread Stopped.")
+
+    def wait_for(self, keys, since_seq, timeout, stop_event=None, by_dest=False) -> set:
+        deadline = time.time() + timeout
+        with self.cond:
+            while True:
+                index = self.last_flow if by_dest else self.last_seen
+                found = {
+                    key for key in keys if index.get(key, 0) > since_seq
+                }
+                remaining = deadline - time.time()
+                if len(found) == len(keys) or remaining <= 0:
+                    return found
+                if self.stop_event.is_set() or (stop_event and stop_event.is_set()):
+                    return found
+                self.cond.wait(min(remaining, 0.5))
+
+_follower = None
+
+def start_log_follower(stop_event, stats=None) -> LogFollower:
+    global _follower
+    validator = get_validator()
+    with _validator_lock:
+        if _follower is None or not _follower.is_alive():
+            _follower = LogFollower(validator, stop_event, stats=stats)
+            _follower.start()
+    return _follower
+
+def get_log_follower() -> LogFollower | None:
+    if _follower and _follower.is_alive():
+        return _follower
+    return None
+
+def _wait_for_flows(follower, active_map, pending, since_seq, timeout, stop_event) -> bool:
+    keys = {}
+    for proc, urls in active_map.items():
+        for url in urls:
+            if pending[proc][url]:
+                continue
+            host = url_record(url).host
+            if not host:
+                pending[proc][url] = True
+                logger.info(f"URL: {url} ({proc}) -> PASS")
+                continue
+            keys.setdefault((proc, host), []).append(url)
+
+    started = time.time()
+    found = follower.wait_for(set(keys), since_seq, timeout, stop_event)
+    logger.info(
+        f"Log Follower: {len(found)}/{len(keys)} flows seen in {time.time() - started:.1f}s"
+    )
+    for key in found:
+        for url in keys[key]:
+            pending[key[0]][url] = True
+            logger.info(f"URL: {url} ({key[0]}) -> PASS")
+    return len(found) == len(keys)
+
+def validate_traffic_flow(
+    process_map, stop_event, exception_checker=None, since_seq=None, timeout=20
+) -> bool:
 
     active_map = {proc: urls for proc, urls in process_map.items() if urls}
 
@@ -337,19 +533,29 @@ def validate_traffic_flow(process_map, stop_event, exception_checker=None) -> bo
     if all(all(status for status in p_urls.values()) for p_urls in pending.values()):
         return True
 
-    log_buffer = ""
+    follower = get_log_follower()
+    if follower and since_seq is not None:
+        if _wait_for_flows(follower, active_map, pending, since_seq, timeout, stop_event):
+            return True
+        if stop_event.is_set():
+            return False
+        return _cert_fallback(active_map, pending, stop_event)
+
+    flow_index = FlowIndex()
     validator = get_validator()
 
     for i in range(5):
-        new_logs = validator.read_new_logs()
-        if new_logs:
-            log_buffer += new_logs
+        new_lines = validator.read_new_lines()
+        if new_lines:
+            added = flow_index.feed_lines(new_lines)
+            logger.info(f"Flow index: {added} new flow records, {len(flow_index.flows)} total")
 
         all_passed = True
         for proc, urls in active_map.items():
             for url in urls:
                 if not pending[proc][url]:
-                    if check_tunneling_in_text(proc, url, log_buffer):
+                    host = url_record(url).host
+                    if not host or flow_index.seen(proc, host):
                         pending[proc][url] = True
                         logger.info(f"URL: {url} ({proc}) -> PASS")
                     else:
@@ -362,22 +568,30 @@ def validate_traffic_flow(process_map, stop_event, exception_checker=None) -> bo
             if smart_sleep(2, stop_event):
                 return False
 
-    failed_items = []
-    for proc, urls in active_map.items():
-        for url in urls:
-            if not pending[proc][url]:
-                logger.info(f"Log validation failed for {url}. Checking Cert...")
-                issuer = util_cert.check_url_cert(url)
+    return _cert_fallback(active_map, pending, stop_event)
 
-                is_valid = False
-                if issuer and ("boomskope.com" in issuer or "goskope.com" in issuer):
-                    is_valid = True
+def _is_netskope_issuer(issuer) -> bool:
+    return bool(issuer) and ("boomskope.com" in issuer or "goskope.com" in issuer)
 
-                if is_valid:
-                    logger.info(f"URL: {url} ({proc}) -> PASS (Cert Issuer: {issuer})")
-                    pending[proc][url] = True
-                else:
-                    failed_items.append((proc, url))
+def _cert_fallback(active_map, pending, stop_event) -> bool:
+    missed = [
+        (proc, url) for proc, urls in active_map.items()
+        for url in urls if not pending[proc][url]
+    ]
+    if not missed:
+        return True
+
+    logger.info(f"Log validation failed for {len(missed)} URLs. Checking Certs...")
+    issuers = util_cert.check_url_certs([url for _, url in missed])
+
+    failed_items = []
+    for proc, url in missed:
+        issuer = issuers.get(url, "")
+        if _is_netskope_issuer(issuer):
+            logger.info(f"URL: {url} ({proc}) -> PASS (Cert Issuer: {issuer})")
+            pending[proc][url] = True
+        else:
+            failed_items.append((proc, url))
 
     if not failed_items:
         return True
@@ -388,15 +602,11 @@ def validate_traffic_flow(process_map, stop_event, exception_checker=None) -> bo
     if smart_sleep(20, stop_event):
         return False
 
+    issuers = util_cert.check_url_certs([url for _, url in failed_items], refresh=True)
     all_passed = True
     for proc, url in failed_items:
-        logger.info(f"Re-testing URL: {url} ({proc})")
-        issuer = util_cert.check_url_cert(url)
-        is_valid = False
-        if issuer and ("boomskope.com" in issuer or "goskope.com" in issuer):
-            is_valid = True
-
-        if is_valid:
+        issuer = issuers.get(url, "")
+        if _is_netskope_issuer(issuer):
             logger.info(f"URL: {url} ({proc}) -> PASS (Cert Issuer: {issuer})")
         else:
             if issuer:
@@ -408,3 +618,67 @@ def validate_traffic_flow(process_map, stop_event, exception_checker=None) -> bo
             all_passed = False
 
     return all_passed
+
+def sample_size(population, margin=0.1, cap=100) -> int:
+    if population <= 0:
+        return 0
+    n0 = 1.96 ** 2 * 0.25 / margin ** 2
+    return min(population, cap, math.ceil(n0 / (1 + (n0 - 1) / population)))
+
+def sample_flows(flows, n) -> list:
+    strata = {}
+    for flow in flows:
+        strata.setdefault(flow[1:], []).append(flow)
+
+    picked = []
+    for group in strata.values():
+        k = max(1, round(n * len(group) / len(flows)))
+        picked += random.sample(group, min(k, len(group)))
+    return picked
+
+def validate_sampled_flows(
+    flow_map, stop_event, since_seq=None, budget=15, max_samples=100
+) -> bool:
+    active_map = {proto: set(flows) for proto, flows in flow_map.items() if flows}
+    if not active_map:
+        return True
+
+    follower = get_log_follower()
+    if follower is None or since_seq is None:
+        logger.info("Flow sampling skipped (log follower not running).")
+        return True
+
+    samples = {}
+    for proto, flows in active_map.items():
+        n = sample_size(len(flows), cap=max_samples)
+        samples[proto] = [
+            (sport or None, normalize_host(host), port)
+            for sport, host, port in sample_flows(list(flows), n)
+        ]
+
+    keys = set().union(*samples.values())
+    start = time.time()
+    found = follower.wait_for(keys, since_seq, budget, stop_event, by_dest=True)
+    if stop_event.is_set():
+        return False
+    logger.info(
+        f"Flow sampling: {len(found)}/{len(keys)} flows seen in {time.time() - start:.1f}s "
+        f"(budget {budget}s)"
+    )
+
+    all_passed = True
+    for proto, picked in samples.items():
+        missed = [key for key in picked if key not in found]
+        total = len(active_map[proto])
+        if not missed:
+            logger.info(f"{proto}: {len(picked)}/{total} sampled flows -> PASS")
+            continue
+        all_passed = False
+        logger.error(
+            f"{proto}: {len(missed)} of {len(picked)} sampled flows (from {total}) "
+            f"not found in nsdebuglog -> FAIL !!!!!!"
+        )
+        for sport, host, port in missed[:5]:
+            src = f"src port {sport} -> " if sport else ""
+            logger.error(f"  missing: {src}{host or '*'}:{port}")
+    return all_passed